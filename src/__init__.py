@@ -9,7 +9,9 @@ import bpy
 from .export_csv_openbve import ExportOpenBveCSVFile
 from .types import CustomOpenBveCsvNode
 from .export_csv import ExportCSVFile
-from .direct_x import ExportDirectXXFile, ImportDirectXXFile
+from .direct_x import ExportDirectXXFile, ImportDirectXXFile, ImportDirectXXFileModal, ImportDirectXXDirectory
+from .preferences import BveImportExportPreferences, ClearParseCache
+from . import export_cache
 from bl_ui import node_add_menu
 
 # locale
@@ -44,12 +46,66 @@ translations_dict = {
         ("*", "Use AddFace2 instead of AddFace"): "AddFaceの代わりにAddFace2を使用する",
         ("*", "Use emissive power"): "放射強度を使用する",
         ("*", "Multiply emissive color by emissive power"): "放射色に放射強度を掛けます",
+        ("*", "Decompress while parsing"): "展開しながら解析する",
+        ("*", "Parse compressed binary files while they are being decompressed"): "圧縮されたバイナリファイルを展開しながら解析します",
+        ("*", "File pattern"): "ファイルのパターン",
+        ("*", "Pattern of the files to import, relative to the directory"): "インポートするファイルのパターン(ディレクトリからの相対パス)",
+        ("*", "Worker processes"): "ワーカープロセス数",
+        ("*", "Number of processes used to parse files (0: number of CPU cores)"): "ファイルの解析に使用するプロセス数(0: CPUのコア数)",
+        ("*", "No X files were found"): "Xファイルが見つかりませんでした",
+        ("*", "Share identical materials"): "同じマテリアルを共有する",
+        ("*", "Use one material for materials with the same color, specular, emission and texture"): "色、鏡面反射、放射、テクスチャが同じマテリアルには1つのマテリアルを使用します",
+        ("*", "One object per mesh"): "メッシュごとに1つのオブジェクトにする",
+        ("*", "Import each mesh as one object with material slots instead of one object per material"): "マテリアルごとではなく、メッシュごとにマテリアルスロットを持つ1つのオブジェクトとしてインポートします",
+        ("*", "Defer texture loading"): "テクスチャの読み込みを遅らせる",
+        ("*", "Create textures without reading the image files. Each image is read when it is first displayed"): "画像ファイルを読まずにテクスチャを作成します。各画像は初めて表示されたときに読み込まれます",
+        ("*", "Frames to import"): "インポートするフレーム",
+        ("*", "Comma separated names of the frames to import. All frames and meshes are imported if empty"): "インポートするフレームの名前をカンマ区切りで指定します。空の場合はすべてのフレームとメッシュをインポートします",
+        ("*", "Import only materials"): "マテリアルのみをインポート",
+        ("*", "Import only the materials of the file without creating objects"): "オブジェクトを作成せずに、ファイルのマテリアルのみをインポートします",
+        ("*", "Share materials across files"): "ファイル間でマテリアルを共有する",
+        ("*", "Also share identical materials between different files"): "異なるファイル間でも同じマテリアルを共有します",
+        ("*", "Use parse cache"): "解析キャッシュを使用する",
+        ("*", "Cache parsed X files on disk so that unchanged files are imported faster"): "解析したXファイルをディスクにキャッシュし、変更されていないファイルを高速にインポートします",
+        ("*", "Parse cache size (MB)"): "解析キャッシュのサイズ(MB)",
+        ("*", "Least recently used entries are deleted when the cache grows beyond this size"): "キャッシュがこのサイズを超えると、最も長く使われていないものから削除されます",
+        ("*", "Clear parse cache"): "解析キャッシュを削除",
+        ("*", "Cleared parse cache"): "解析キャッシュを削除しました",
+        ("*", "Import cancelled"): "インポートを中止しました",
+        ("*", "Referenced mesh not found"): "参照されたメッシュが見つかりません",
+        ("*", "Referenced material not found"): "参照されたマテリアルが見つかりません",
+        ("*", "Esc to cancel"): "Escで中止",
+        ("*", "Loading parse cache"): "解析キャッシュを読み込み中",
+        ("*", "Reading X file"): "Xファイルを読み込み中",
+        ("*", "Decompressing X file"): "Xファイルを展開中",
+        ("*", "Parsing X file"): "Xファイルを解析中",
+        ("*", "Writing parse cache"): "解析キャッシュを書き込み中",
+        ("*", "Creating objects"): "オブジェクトを作成中",
+        ("*", "Load cache"): "キャッシュの読み込み",
+        ("*", "Read"): "読み込み",
+        ("*", "Decompress"): "展開",
+        ("*", "Parse"): "解析",
+        ("*", "Write cache"): "キャッシュの書き込み",
+        ("*", "Create objects"): "オブジェクトの作成",
+        ("*", "Link to scene"): "シーンへのリンク",
+        ("*", "Use export cache"): "エクスポートのキャッシュを使用する",
+        ("*", "Keep the processed geometry of each object in memory so that unchanged objects are exported faster"): "処理したオブジェクトごとの形状をメモリに保持し、変更されていないオブジェクトを高速にエクスポートします",
+        ("*", "Export cache size (MB)"): "エクスポートのキャッシュのサイズ(MB)",
+        ("*", "Least recently used objects are removed when the export cache grows beyond this size"): "エクスポートのキャッシュがこのサイズを超えると、最も長く使われていないオブジェクトから削除されます",
+        ("*", "Position weld tolerance"): "位置の結合の許容値",
+        ("*", "Vertex positions are rounded to multiples of this value when merging vertices (0: merge only identical positions)"): "頂点を結合するとき、位置をこの値の倍数に丸めます(0: 同じ位置のみ結合)",
+        ("*", "Normal weld tolerance"): "法線の結合の許容値",
+        ("*", "Normals are rounded to multiples of this value when merging normals (0: merge only identical normals)"): "法線を結合するとき、この値の倍数に丸めます(0: 同じ法線のみ結合)",
+        ("*", "UV weld tolerance"): "UVの結合の許容値",
+        ("*", "UVs are rounded to multiples of this value when merging vertices"): "頂点を結合するとき、UVをこの値の倍数に丸めます",
     }
 }
 
 # メニューに追加 / Add to the menu
 def menu_func_import(self, context):
     self.layout.operator(ImportDirectXXFile.bl_idname, text="DirectX XFile (.x) for BVE")
+    self.layout.operator(ImportDirectXXFileModal.bl_idname, text="DirectX XFile (.x) for BVE (Background)")
+    self.layout.operator(ImportDirectXXDirectory.bl_idname, text="DirectX XFile Directory (.x) for BVE")
 
 
 def menu_func_export(self, context):
@@ -65,10 +121,14 @@ def add_node_to_menu(self, context):
 
 classes = (
     ImportDirectXXFile,
+    ImportDirectXXFileModal,
+    ImportDirectXXDirectory,
     ExportDirectXXFile,
     ExportCSVFile,
     ExportOpenBveCSVFile,
     CustomOpenBveCsvNode,
+    ClearParseCache,
+    BveImportExportPreferences,
 )
 
 def register():
@@ -82,8 +142,12 @@ def register():
 
     bpy.app.translations.register(__name__, translations_dict)
 
+    export_cache.register()
+
 
 def unregister():
+    export_cache.unregister()
+
     bpy.app.translations.unregister(__name__)
 
     bpy.types.TOPBAR_MT_file_import.remove(menu_func_import)
@@ -1,12 +1,19 @@
 import re
+import array
 import mathutils
 import struct
 import zlib
 import os
 import re
+import glob
+import time
+import concurrent.futures
+import functools
+import threading
+from concurrent.futures.process import BrokenProcessPool
 from typing import Self
 import bpy
-from bpy.props import StringProperty, BoolProperty, FloatProperty, EnumProperty
+from bpy.props import StringProperty, BoolProperty, FloatProperty, EnumProperty, IntProperty
 from bpy_extras.io_utils import ImportHelper, ExportHelper
 import zlib
 from typing import Self
@@ -14,132 +21,28 @@ from typing import Self
 from .utility import float_to_str, vertex_to_str
 from . import utility
 from .model_data_utility import ModelDataUtility
-
-TOKEN_NAME = 1
-TOKEN_STRING = 2
-TOKEN_INTEGER = 3
-TOKEN_GUID = 5
-TOKEN_INTEGER_LIST = 6
-TOKEN_FLOAT_LIST = 7
-
-TOKEN_OBRACE = 0x0A
-TOKEN_CBRACE = 0x0B
-TOKEN_OPAREN = 0x0C
-TOKEN_CPAREN = 0x0D
-TOKEN_OBRACKET = 0x0E
-TOKEN_CBRACKET = 0x0F
-TOKEN_OANGLE = 0x10
-TOKEN_CANGLE = 0x11
-TOKEN_DOT = 0x12
-TOKEN_COMMA = 0x13
-TOKEN_SEMICOLON = 0x14
-TOKEN_TEMPLATE = 0x1F
-TOKEN_WORD = 0x28
-TOKEN_DWORD = 0x29
-TOKEN_FLOAT = 0x2A
-TOKEN_DOUBLE = 0x2B
-TOKEN_CHAR = 0x2C
-TOKEN_UCHAR = 0x2D
-TOKEN_SWORD = 0x2E
-TOKEN_SDWORD = 0x2F
-TOKEN_VOID = 0x30
-TOKEN_LPSTR = 0x31
-TOKEN_UNICODE = 0x32
-TOKEN_CSTRING = 0x33
-TOKEN_ARRAY = 0x34
-
-class XModelMesh:
-    vertices = []
-    faces: list[list[int]] = []
-    tex_coords = []
-    normals = []
-    normal_faces = []
-    materials = []
-    material_face_indexes = []
-    material_count = 0
-
-    def __init__(self):
-        self.vertices = []
-        self.faces = []
-        self.tex_coords = []
-        self.normals = []
-        self.normal_faces = []
-        self.materials = []
-        self.material_face_indexes = []
-        self.material_count = 0
-
-class XModelNode:
-    node_name: str | None
-    transform_matrix: mathutils.Matrix = mathutils.Matrix.Identity(4)
-    mesh: XModelMesh = XModelMesh()
-    children: list[Self] = []
-
-    def __init__(self):
-        self.node_name: str | None = ""
-        self.transform_matrix = mathutils.Matrix.Identity(4)
-        self.mesh = XModelMesh()
-        self.children = []
-
-class XElement:
-    element_type = ""
-    data = ""
-    children = []
-    end_line_num = 0
-    name = ""
-
-class XMaterial:
-    face_color: tuple[float, float, float, float] = (0.0, 0.0, 0.0, 1.0)
-    power: float = 0.0
-    specular_color: tuple[float, float, float] = (0.0, 0.0, 0.0)
-    emission_color: tuple[float, float, float] = (0.0, 0.0, 0.0)
-    texture_path: str | None = ""
-    name: str | None = ""
-
-def to_XElement(x_model_file_string, start_line_num):
-    element_type = ""
-    elem_data = ""
-    end_index = 0
-    children = []
-    skip = 0
-    element_name = ""
-    for line_num in range(len(x_model_file_string))[start_line_num:]:
-        if line_num <= skip:
-            continue
-        line = x_model_file_string[line_num]
-        pos = line.find("{")
-        if pos != -1 and "}" in line:
-            continue
-
-        if "{" in line:
-            if element_type == "":
-                element_type = re.sub('\t', "", line[0:line.index("{")])
-                element_type = re.sub('^ *', "", element_type)
-                if element_type.find(" ") != -1:
-                    element_name = element_type[element_type.find(" ") + 1:]
-                    element_type = element_type[0:element_type.find(" ")]
-                    search_result = re.search("[^ ]*", element_name)
-                    if search_result:
-                        element_name = search_result.group(0)
-                if element_type == "":
-                    element_type = "empty"
-            else:
-                x_element = to_XElement(x_model_file_string, line_num)
-                children.append(x_element)
-                skip = x_element.end_line_num
-        else:
-            if "}" in line:
-                end_index = line_num
-                break
-            else:
-                if len(element_type) > 0:
-                    elem_data += line.replace("\r", "")
-    result = XElement()
-    result.element_type = element_type
-    result.data = elem_data
-    result.children = children
-    result.end_line_num = end_index
-    result.name = element_name
-    return result
+from . import direct_x_parser
+from .preferences import get_parse_cache, get_export_cache
+from .direct_x_parser import XModelNode, XModelMesh, XMaterial, XFileFormatError, XParseProgress, parse_x_file
+from .direct_x_parser import weld_mesh_positions, extract_mesh_faces
+from .direct_x_parser import (
+    TOKEN_NAME,
+    TOKEN_STRING,
+    TOKEN_GUID,
+    TOKEN_INTEGER_LIST,
+    TOKEN_FLOAT_LIST,
+    TOKEN_OBRACE,
+    TOKEN_CBRACE,
+    TOKEN_OBRACKET,
+    TOKEN_CBRACKET,
+    TOKEN_DOT,
+    TOKEN_SEMICOLON,
+    TOKEN_TEMPLATE,
+    TOKEN_DWORD,
+    TOKEN_FLOAT,
+    TOKEN_LPSTR,
+    TOKEN_ARRAY,
+)
 
 def write_int(f, i):
     f.write(i.to_bytes(4, byteorder='little'))
@@ -183,7 +86,355 @@ def write_float_list(f, f_list):
         write_float(f, i)
         
 
-class ImportDirectXXFile(bpy.types.Operator, ImportHelper):
+# Xファイルの座標系(X Y Z)とBlenderの座標系(X Z Y)を入れ替える行列 / Matrix that swaps the X file coordinate system (X Y Z) and the Blender one (X Z Y)
+AXIS_CONVERSION_MATRIX = mathutils.Matrix((
+    (1.0, 0.0, 0.0, 0.0),
+    (0.0, 0.0, 1.0, 0.0),
+    (0.0, 1.0, 0.0, 0.0),
+    (0.0, 0.0, 0.0, 1.0),
+))
+
+# バックグラウンドのインポートでタイマーを呼ぶ間隔と、1回にオブジェクトを作成する時間(秒) /
+#  Interval of the timer and the time spent creating objects per call in the background import (seconds)
+MODAL_TIMER_INTERVAL = 0.01
+MODAL_TIME_SLICE = 0.03
+
+# 解析の段階ごとにステータスバーに表示する文字列 / Text shown in the status bar for each parse phase
+PARSE_PHASE_STATUS = {
+    "Load cache": "Loading parse cache",
+    "Read": "Reading X file",
+    "Decompress": "Decompressing X file",
+    "Parse": "Parsing X file",
+    "Write cache": "Writing parse cache",
+}
+
+# マテリアルを同じとみなす値の差 / Difference in values for which materials are considered the same
+MATERIAL_TOLERANCE = 1e-4
+
+# 許容差で値を量子化する / Quantize values by the tolerance
+def quantize_values(values):
+    return tuple(round(value / MATERIAL_TOLERANCE) for value in values)
+
+# Xファイルのノードからオブジェクトを作成する / Create objects from X file nodes
+# scale, gamma_correction, share_materials, single_object, defer_textures, filepathのプロパティを持つオペレーターで使用する /
+#  Used by operators that have the scale, gamma_correction, share_materials, single_object, defer_textures and filepath properties
+class XObjectCreator:
+    def initialize(self):
+        self.object_index = 0
+        # オブジェクトを追加するコレクション(Noneの場合はシーンのコレクション) / Collection to add objects to (the scene collection if None)
+        self.collection = None
+        # (Xファイルのディレクトリ, テクスチャのパス)から解決したパスを引く辞書 / Dictionary to look up the resolved path from (directory of the X file, texture path)
+        self.texture_paths = {}
+        # 正規化した絶対パスから読み込んだ画像を引く辞書 / Dictionary to look up the loaded image from the normalized absolute path
+        self.texture_images = {}
+        # 値を量子化したキーから共有するマテリアルを引く辞書 / Dictionary to look up the shared material from the key of quantized values
+        self.shared_materials = {}
+
+    # 解析中の警告を報告する / Report the warnings during parsing
+    def report_parse_warnings(self, root_node: XModelNode, prefix=""):
+        for message, name in root_node.warnings:
+            self.report({'WARNING'}, f"{prefix}{bpy.app.translations.pgettext(message)}: {name}")
+
+    # テクスチャのパスを解決する(見つからない場合はNone) / Resolve the texture path (None if not found)
+    def resolve_texture_path(self, texture_path):
+        if not texture_path:
+            return None
+        directory = os.path.dirname(bpy.path.abspath(self.filepath))
+        key = (directory, texture_path)
+        path = self.texture_paths.get(key, "")
+        if path == "":
+            # Xファイルからの相対パスを優先する / Prefer the path relative to the X file
+            path = os.path.join(directory, texture_path)
+            if not os.path.exists(path):
+                path = texture_path if os.path.exists(texture_path) else None
+            if path is not None:
+                path = os.path.normpath(os.path.abspath(path))
+            self.texture_paths[key] = path
+        return path
+
+    # テクスチャを読み込む(同じ画像はインポート中に1度だけ読み込む) / Load a texture (the same image is loaded only once during the import)
+    def load_texture(self, texture_path):
+        path = self.resolve_texture_path(texture_path)
+        if path is None:
+            return None
+
+        image_key = os.path.normcase(path)
+        image = self.texture_images.get(image_key)
+        if image is None:
+            if self.defer_textures:
+                image = self.find_image(image_key)
+                if image is None:
+                    # ファイルを読まずにパスだけを持つ画像を作成する(初めて表示されたときに読み込まれる) /
+                    #  Create an image holding only the path without reading the file (it is read when first displayed)
+                    image = bpy.data.images.new(os.path.basename(path), 1, 1)
+                    image.source = 'FILE'
+                    image.filepath = path
+            else:
+                # 画像を読み込み(既に読み込まれている場合はそれを使う) / Load the image (reuse it if it is already loaded)
+                image = bpy.data.images.load(filepath=path, check_existing=True)
+            image.colorspace_settings.name = 'sRGB'
+            self.texture_images[image_key] = image
+        return image
+
+    # 同じファイルの画像が既にあればそれを返す / Return the image of the same file if it already exists
+    def find_image(self, image_key):
+        for image in bpy.data.images:
+            if image.source == 'FILE' and os.path.normcase(os.path.normpath(bpy.path.abspath(image.filepath))) == image_key:
+                return image
+        return None
+
+    # すべてのオブジェクトとマテリアルを削除 / Delete all objects and materials
+    def remove_all_objects_and_materials(self):
+        # 1つずつ削除すると削除のたびに参照の更新が走るため、まとめて削除する / Removing one by one updates references on every removal, so remove them at once
+        objects = [obj for obj in bpy.context.scene.objects if obj.type == 'MESH']
+        bpy.data.batch_remove(objects + list(bpy.data.materials))
+    
+    # 同じ値のマテリアルは1つのBlenderのマテリアルを共有する / Materials with the same values share one Blender material
+    def get_material(self, x_material: XMaterial, material_name, available_material):
+        if not self.share_materials:
+            return self.create_material(x_material, material_name, available_material)
+        texture_path = self.resolve_texture_path(x_material.texture_path)
+        key = (
+            available_material,
+            quantize_values(x_material.face_color),
+            quantize_values((x_material.power,)),
+            quantize_values(x_material.specular_color),
+            quantize_values(x_material.emission_color),
+            os.path.normcase(texture_path) if texture_path is not None else None,
+        )
+        material = self.shared_materials.get(key)
+        if material is None:
+            material = self.create_material(x_material, material_name, available_material)
+            self.shared_materials[key] = material
+        return material
+
+    def create_material(self, x_material: XMaterial, material_name, available_material):
+        material = bpy.data.materials.new(material_name)
+
+        # ブレンドモードの設定 / Setting the blend mode
+        material.blend_method = 'CLIP'
+
+        # ノードを有効化 / Enable nodes
+        material.use_nodes = True
+        nodes = material.node_tree.nodes
+        # プリンシプルBSDFを取得 / Get the principle BSDF
+        principled = next(n for n in nodes if n.type == 'BSDF_PRINCIPLED')
+
+        color = (1.0, 1.0, 1.0)
+        material.specular_intensity = 0.0
+        if available_material:
+            color = x_material.face_color
+            material.specular_intensity = x_material.power
+            material.specular_color = x_material.specular_color
+            principled.inputs['Base Color'].default_value = color
+            principled.inputs['Alpha'].default_value = x_material.face_color[3]
+        material.diffuse_color = color
+
+        # 鏡面反射 / Specular reflection
+        principled.inputs['Specular IOR Level'].default_value = x_material.power
+        principled.inputs['Specular Tint'].default_value = (*x_material.specular_color, 1.0)
+        # 放射を設定 / Set emission
+        principled.inputs['Emission Color'].default_value = x_material.emission_color + (1.0,)
+
+        # テクスチャの紐付け / Linking textures
+        image = self.load_texture(x_material.texture_path)
+
+        if image is not None:
+            # 画像ノードを作成 / Create image node
+            texture = material.node_tree.nodes.new("ShaderNodeTexImage")
+            texture.location = (-300, 150)
+
+            texture.image = image
+            # ベースカラーとテクスチャのカラーをリンクさせる / Link the base color and the texture color
+            material.node_tree.links.new(principled.inputs['Base Color'], texture.outputs['Color'])
+            # アルファとテクスチャのアルファをリンクさせる / Link the alpha and the texture alpha
+            material.node_tree.links.new(principled.inputs['Alpha'], texture.outputs['Alpha'])
+        elif self.gamma_correction:
+            # ガンマノードを作成 / Create gamma node
+            gamma_node = material.node_tree.nodes.new("ShaderNodeGamma")
+            gamma_node.location = (-250, 250)
+
+            gamma_node.inputs['Color'].default_value = color
+            gamma_node.inputs['Gamma'].default_value = 2.2
+            # ベースカラーとガンマのカラーをリンクさせる / Link the base color and the gamma color
+            material.node_tree.links.new(principled.inputs['Base Color'], gamma_node.outputs['Color'])
+
+        return material
+
+    # ルートノードからオブジェクトを作成 / Create objects from the root node
+    def create_objects(self, root_node: XModelNode):
+        for _ in self.create_objects_iter(root_node):
+            pass
+
+    # ルートノードからオブジェクトを作成し、手順を1つ終えるたびに(終えた数, 全体の数)を返す /
+    #  Create objects from the root node, yielding (finished count, total count) after each step
+    def create_objects_iter(self, root_node: XModelNode):
+        # 手順の数はメッシュの数 + 異なるメッシュの数(更新) + マテリアルの数 / The number of steps is the number of meshes + the number of distinct meshes (update) + the number of materials
+        mesh_count = 0
+        distinct_meshes = set()
+        nodes = [root_node]
+        while len(nodes) != 0:
+            node = nodes.pop()
+            nodes.extend(node.children)
+            mesh_count += len(node.meshes)
+            distinct_meshes.update(node.meshes)
+        total = mesh_count + len(distinct_meshes) + len(root_node.materials)
+        done = 0
+
+        # Xファイルのメッシュから作成したメッシュデータ(同じメッシュを参照するフレームで共有する) /
+        #  Mesh data created from X file meshes (shared by frames that reference the same mesh)
+        self.mesh_data = {}
+        for _ in self.create_obj_from_node(mathutils.Matrix.Identity(4), root_node):
+            done += 1
+            yield done, total
+        # メッシュの検証と更新はすべて作成してからまとめて行う / Validate and update meshes at once after creating everything
+        for meshes in self.mesh_data.values():
+            for mesh in meshes:
+                # 結合で同じ頂点が重なった面などの不正なデータを修正する(UVは残す) / Fix invalid data such as faces with the same vertex repeated by welding (UVs are kept)
+                mesh.validate(clean_customdata=False)
+                mesh.update(calc_edges=True)
+            done += 1
+            yield done, total
+        self.mesh_data = {}
+
+        # マテリアルのみを読み込んだ場合 / When only materials were loaded
+        for i, x_material in enumerate(root_node.materials):
+            material_name = x_material.name if x_material.name else os.path.splitext(bpy.path.basename(self.filepath))[0] + "Material" + str(i)
+            material = self.get_material(x_material, material_name, True)
+            # オブジェクトで使われていなくても保存時に消えないようにする / Keep the material when saving even if no object uses it
+            material.use_fake_user = True
+            done += 1
+            yield done, total
+
+    # 作成したコレクションをシーンにリンクする(何も作成しなかった場合は削除する) / Link the created collection to the scene (remove it if nothing was created)
+    def link_collection(self, context):
+        if len(self.collection.objects) != 0:
+            context.scene.collection.children.link(self.collection)
+        else:
+            bpy.data.collections.remove(self.collection)
+
+    # Xファイルの変換行列をBlenderの座標系に変換 / Convert a transform matrix of the X file to the Blender coordinate system
+    def convert_transform_matrix(self, transform_matrix):
+        # Xファイルは行ベクトル、Blenderは列ベクトルなので転置する / X files use row vectors and Blender uses column vectors, so transpose
+        matrix = mathutils.Matrix(transform_matrix).transposed()
+        # DirectX X Y Z
+        # Blender X Z Y
+        matrix = AXIS_CONVERSION_MATRIX @ matrix @ AXIS_CONVERSION_MATRIX
+        matrix.translation = matrix.translation * self.scale
+        return matrix
+
+    # メッシュを1つ作成するたびに制御を返す / Yields control each time a mesh is created
+    def create_obj_from_node(self, matrix: mathutils.Matrix, node: XModelNode):
+        if matrix is None:
+            matrix = mathutils.Matrix.Identity(4)
+
+        for child in node.children:
+            yield from self.create_obj_from_node(matrix @ self.convert_transform_matrix(child.transform_matrix), child)
+
+        # モデル名を決定 / Determine the model name
+        model_name = (node.node_name if node.node_name is not None and len(node.node_name) != 0 else os.path.splitext(bpy.path.basename(self.filepath))[0]) + str(self.object_index)
+        self.object_index += 1
+
+        collection = self.collection if self.collection is not None else bpy.context.scene.collection
+        for x_mesh in node.meshes:
+            # 他のフレームで作成済みのメッシュはメッシュデータを共有する(リンク複製) / Meshes already created for another frame share the mesh data (linked duplicates)
+            meshes = self.mesh_data.get(x_mesh)
+            if meshes is None:
+                meshes = self.create_mesh_data(x_mesh, model_name)
+                self.mesh_data[x_mesh] = meshes
+
+            for mesh in meshes:
+                # メッシュでオブジェクトを作成 / Create an object with the mesh
+                obj = bpy.data.objects.new(model_name, mesh)
+                obj.matrix_world = matrix
+
+                # オブジェクトをシーンに追加 / Add object to scene
+                collection.objects.link(obj)
+            yield
+
+    # Xファイルのメッシュからメッシュデータを作成する / Create mesh data from a mesh of the X file
+    def create_mesh_data(self, mesh: XModelMesh, model_name):
+        # 同じ座標の頂点を1つにまとめる / Weld vertices with the same position
+        mesh_vertexes, mesh_vertexes_redirect = weld_mesh_positions(mesh, self.scale)
+        face_count = mesh.get_face_count()
+        mesh_material_face_indexes = array.array(mesh.material_face_indexes.typecode, mesh.material_face_indexes)
+        mesh_materials: list[XMaterial] = list(mesh.materials)
+        material_faces: list[list[int]] = []
+        material_count = mesh.material_count
+        for i in range(material_count):
+            material_faces.append([])
+
+        # マテリアル別に面を整理 / Organize faces by material
+        if material_count > 0:
+            for i in range(face_count):
+                if len(mesh_material_face_indexes) <= i:
+                    mesh_material_face_indexes.append(0)
+                material_id = mesh_material_face_indexes[i]
+                material_faces[material_id].append(i)
+
+        # マテリアルを作成 / Create materials
+        materials = {}
+        for j in range(len(material_faces)):
+            faces = material_faces[j]
+            if len(faces) == 0:
+                continue
+            # マテリアルの有無 / Presence or absence of materials
+            available_material = len(mesh_materials) > mesh_material_face_indexes[faces[0]]
+            x_material: XMaterial = mesh_materials[mesh_material_face_indexes[faces[0]]]
+            material_name = model_name + "Material"
+            if x_material.name:
+                material_name = x_material.name
+            materials[j] = self.get_material(x_material, material_name, available_material)
+
+        if self.single_object:
+            # メッシュ全体を1つのオブジェクトにし、マテリアルはスロットで分ける / Make the whole mesh one object and separate materials by slots
+            slots = {}
+            for material in materials.values():
+                slots.setdefault(material, len(slots))
+            material_slots = {j: slots[material] for j, material in materials.items()}
+            faces = [i for i in range(face_count) if material_count > 0 and mesh_material_face_indexes[i] in material_slots]
+            material_indices = array.array('i', [material_slots[mesh_material_face_indexes[i]] for i in faces])
+            object_parts = [(faces, list(slots), material_indices)] if len(faces) > 0 else []
+        else:
+            # マテリアルごとにオブジェクトを作成 / Create objects for each material
+            object_parts = [(material_faces[j], [material], None) for j, material in materials.items()]
+
+        meshes = []
+        for faces, object_materials, material_indices in object_parts:
+            # 使用する頂点だけを抽出して頂点データと面データを作成 / Extract only the vertices used and create vertex data and face data
+            vertex_positions, loop_vertex_indices, loop_starts, loop_uvs = extract_mesh_faces(mesh, mesh_vertexes, mesh_vertexes_redirect, faces)
+            # メッシュを作成 / Create mesh
+            mesh_data = self.create_mesh(vertex_positions, loop_vertex_indices, loop_starts, loop_uvs, material_indices)
+            for material in object_materials:
+                mesh_data.materials.append(material)
+            meshes.append(mesh_data)
+        return meshes
+
+    # 平坦な配列からメッシュを作成する / Create a mesh from flat arrays
+    # material_indicesを指定した場合は面ごとのマテリアルのスロットを設定する / If material_indices is given, set the material slot of each face
+    def create_mesh(self, vertex_positions, loop_vertex_indices, loop_starts, loop_uvs, material_indices=None):
+        mesh = bpy.data.meshes.new("mesh")
+
+        # メッシュに頂点と面のデータを挿入 / Insert vertex and face data into the mesh
+        mesh.vertices.add(len(vertex_positions) // 3)
+        mesh.vertices.foreach_set("co", vertex_positions)
+        mesh.loops.add(len(loop_vertex_indices))
+        mesh.loops.foreach_set("vertex_index", loop_vertex_indices)
+        # loop_totalはloop_startから決まる / loop_total is determined from loop_start
+        mesh.polygons.add(len(loop_starts))
+        mesh.polygons.foreach_set("loop_start", loop_starts)
+        if material_indices is not None:
+            mesh.polygons.foreach_set("material_index", material_indices)
+
+        # UVデータがある場合のみUVレイヤーを作成して頂点と紐付ける / Create a UV layer and link UV data to vertices only if there is UV data
+        if len(loop_uvs) > 0:
+            uv = mesh.uv_layers.new(name="UVMap")
+            uv.data.foreach_set("uv", loop_uvs)
+
+        # mesh.update()はcreate_objectsでまとめて呼ぶ / mesh.update() is called at once in create_objects
+        return mesh
+
+class ImportDirectXXFile(bpy.types.Operator, ImportHelper, XObjectCreator):
     bl_idname = "import.directx_x_for_bve"
     bl_description = 'Import from X file (.x)'
     bl_label = "Import DirectX X File"
@@ -218,649 +469,382 @@ class ImportDirectXXFile(bpy.types.Operator, ImportHelper):
         default=True,
     )
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.initialize()
-    
-    def initialize(self):
-        self.is_binary = False
-        self.float_size = 32
-        self.ret_string = ""
-        self.ret_integer = 0
-        self.ret_float = 0
-        self.ret_integer_list = []
-        self.ret_float_list = []
-        self.ret_uuid = ""
-        self.byte_buffer = utility.ByteBuffer(bytes())
-        self.text_content = ""
-        self.text_pos = 0
-        self.text_brace_count = 0
-        self.bin_brace_count = 0
-        self.object_index = 0
-    
-    def create_obj_from_node(self, matrix: mathutils.Matrix, node: XModelNode):
-        if matrix is None:
-            matrix = mathutils.Matrix.Identity(4)
-
-        for child in node.children:
-            self.create_obj_from_node(matrix @ child.transform_matrix, child)
-
-        mesh = node.mesh
-
-        vertex_index = 0
-        mesh_vertexes = []
-        mesh_vertexes_redirect = {}
-        for vertex in mesh.vertices:
-            # DirectX X Y Z
-            # Blender X Z Y
-            vector = (vertex[0] * self.scale, vertex[2] * self.scale, vertex[1] * self.scale)
-            # 重複した座標は1つにまとめる / Combine duplicate coordinates into one
-            # リダイレクト先を登録しておく / Register the redirect destination
-            if vector in mesh_vertexes:
-                mesh_vertexes_redirect[vertex_index] = mesh_vertexes.index(vector)
-            else:
-                mesh_vertexes_redirect[vertex_index] = len(mesh_vertexes)
-                mesh_vertexes.append(vector)
-            vertex_index += 1
-            if vertex_index == len(mesh.vertices):
-                break
-        indexes_size = 0
-        mesh_faces = []
-        mesh_faces_exact = []
-        mesh_tex_coord = []
-        mesh_material_face_indexes = []
-        mesh_materials: list[XMaterial] = []
-        for indexes in mesh.faces:
-            # Blenderに記録する際に使用する頂点のインデックス / Index of the vertex used when recording in Blender
-            indexes.reverse()
-            vertexes = []
-            for l in range(len(indexes)):
-                if indexes[l] in mesh_vertexes_redirect:
-                    vertexes.append(mesh_vertexes_redirect[indexes[l]])
-                else:
-                    vertexes.append(indexes[l])
-            mesh_faces.append(vertexes)
-            # Xファイルに記述された実際の使用する頂点のインデックス(UV登録時に使用) / Actual vertex index used in the X file (used when registering UV)
-            mesh_faces_exact.append(indexes)
-            if len(mesh_faces) == indexes_size:
-                break
-
-        for vertex in mesh.tex_coords:
-            vertex[1] = -vertex[1] + 1
-            mesh_tex_coord.append(vertex)
-            
-        for index in mesh.material_face_indexes:
-            mesh_material_face_indexes.append(index)
-        
-        for material in mesh.materials:
-            mesh_materials.append(material)
-        material_faces: list[list[int]] = []
-        material_count = mesh.material_count
-        for i in range(material_count):
-            material_faces.append([])
+    stream_decompression: BoolProperty(
+        name="Decompress while parsing",
+        description="Parse compressed binary files while they are being decompressed",
+        default=False,
+    )
 
-        # マテリアル別に面を整理 / Organize faces by material
-        if material_count > 0:
-            for i in range(len(mesh_faces)):
-                if len(mesh_material_face_indexes) <= i:
-                    mesh_material_face_indexes.append(0)
-                material_id = mesh_material_face_indexes[i]
-                material_faces[material_id].append(i)
+    share_materials: BoolProperty(
+        name="Share identical materials",
+        description="Use one material for materials with the same color, specular, emission and texture",
+        default=True,
+    )
 
-        # モデル名を決定 / Determine the model name
-        model_name = (node.node_name if node.node_name is not None and len(node.node_name) != 0 else os.path.splitext(bpy.path.basename(self.filepath))[0]) + str(self.object_index)
-        self.object_index += 1
+    single_object: BoolProperty(
+        name="One object per mesh",
+        description="Import each mesh as one object with material slots instead of one object per material",
+        default=False,
+    )
 
-        # マテリアルごとにオブジェクトを作成 / Create objects for each material
-        for j in range(len(material_faces)):
-            faces_data = []
-            vertexes_data = []
-            faces = material_faces[j]
-            if len(faces) == 0:
-                continue
-            # マテリアルの有無 / Presence or absence of materials
-            available_material = len(mesh_materials) > mesh_material_face_indexes[faces[0]]
-            x_material: XMaterial = mesh_materials[mesh_material_face_indexes[faces[0]]]
-            # マテリアルを作成 / Create material
-            material_name = model_name + "Material"
-            if x_material.name:
-                material_name = x_material.name
-            material = bpy.data.materials.new(material_name)
-
-            # ブレンドモードの設定 / Setting the blend mode
-            material.blend_method = 'CLIP'
-
-            # ノードを有効化 / Enable nodes
-            material.use_nodes = True
-            nodes = material.node_tree.nodes
-            # プリンシプルBSDFを取得 / Get the principle BSDF
-            principled = next(n for n in nodes if n.type == 'BSDF_PRINCIPLED')
-
-            color = (1.0, 1.0, 1.0)
-            material.specular_intensity = 0.0
-            if available_material:
-                color = x_material.face_color
-                material.specular_intensity = x_material.power
-                material.specular_color = x_material.specular_color
-                principled.inputs['Base Color'].default_value = color
-                principled.inputs['Alpha'].default_value = x_material.face_color[3]
-            material.diffuse_color = color
-
-            # 鏡面反射 / Specular reflection
-            principled.inputs['Specular IOR Level'].default_value = x_material.power
-            principled.inputs['Specular Tint'].default_value = (*x_material.specular_color, 1.0)
-            # 放射を設定 / Set emission
-            principled.inputs['Emission Color'].default_value = x_material.emission_color + (1.0,)
-
-            # テクスチャの紐付け / Linking textures
-            if x_material.texture_path and x_material.texture_path != "":
-                path = "/".join(bpy.path.abspath(self.filepath).split(os.path.sep)[0:-1])
-                path = path + "/" + x_material.texture_path
-                if os.path.exists(path):
-                    x_material.texture_path = path
-
-            if x_material.texture_path and os.path.exists(x_material.texture_path):
-                # 画像ノードを作成 / Create image node
-                texture = material.node_tree.nodes.new("ShaderNodeTexImage")
-                texture.location = (-300, 150)
-
-                # 画像を読み込み / Load image
-                texture.image = bpy.data.images.load(filepath=x_material.texture_path)
-                texture.image.colorspace_settings.name = 'sRGB'
-                # ベースカラーとテクスチャのカラーをリンクさせる / Link the base color and the texture color
-                material.node_tree.links.new(principled.inputs['Base Color'], texture.outputs['Color'])
-                # アルファとテクスチャのアルファをリンクさせる / Link the alpha and the texture alpha
-                material.node_tree.links.new(principled.inputs['Alpha'], texture.outputs['Alpha'])
-            elif self.gamma_correction:
-                # ガンマノードを作成 / Create gamma node
-                gamma_node = material.node_tree.nodes.new("ShaderNodeGamma")
-                gamma_node.location = (-250, 250)
-
-                gamma_node.inputs['Color'].default_value = color
-                gamma_node.inputs['Gamma'].default_value = 2.2
-                # ベースカラーとガンマのカラーをリンクさせる / Link the base color and the gamma color
-                material.node_tree.links.new(principled.inputs['Base Color'], gamma_node.outputs['Color'])
-
-            # 頂点データと面データを作成 / Create vertex data and face data
-            # マテリアルが使う頂点だけを抽出、その頂点のインデックスに合わせて面の頂点のインデックスを変更 /
-            #  Extract only the vertices used by the material, and change the vertex indexes of the faces to match the indexes of those vertices
-            mesh_indexes = {}
-            for i in faces:
-                face = mesh_faces[i]
-                # faces_data.append(face)
-                for k in face:
-                    if mesh_vertexes[k] in vertexes_data:
-                        mesh_indexes[k] = vertexes_data.index(mesh_vertexes[k])
-                    else:
-                        mesh_indexes[k] = len(vertexes_data)
-                        vertexes_data.append(mesh_vertexes[k])
-                count = 0
-                face_data = [0] * len(face)
-                for k in face:
-                    face_data[count] = mesh_indexes[k]
-                    count += 1
-                faces_data.append(face_data)
+    defer_textures: BoolProperty(
+        name="Defer texture loading",
+        description="Create textures without reading the image files. Each image is read when it is first displayed",
+        default=False,
+    )
 
-            # メッシュを作成 / Create mesh
-            mesh = bpy.data.meshes.new("mesh")
-
-            # メッシュに頂点と面のデータを挿入 / Insert vertex and face data into the mesh
-            mesh.from_pydata(vertexes_data, [], faces_data)
-
-            # UVレイヤーの作成 / Create UV layer
-            mesh.uv_layers.new(name="UVMap")
-            uv = mesh.uv_layers["UVMap"]
-
-            # UVデータを頂点と紐付ける / Link UV data to vertices
-            count = 0
-            for i in faces:
-                for k in mesh_faces_exact[i]:
-                    uv.data[count].uv = mesh_tex_coord[k]
-                    count += 1
-
-            mesh.update()
-
-            # メッシュでオブジェクトを作成 / Create an object with the mesh
-            obj = bpy.data.objects.new(model_name, mesh)
-            obj.data = mesh
-            obj.data.materials.append(material)
-
-            # オブジェクトをシーンに追加 / Add object to scene
-            scene = bpy.context.scene
-            scene.collection.objects.link(obj)
-
-    def parse_mesh_text(self, mesh: XModelMesh):
-        object_name = self.get_object_name_text()
-        vertex_size = self.get_next_int_text()
-        for _ in range(vertex_size):
-            vertex = [self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text()]
-            mesh.vertices.append(vertex)
-        faces_size = self.get_next_int_text()
-        for i in range(faces_size):
-            vertex_size = self.get_next_int_text()
-            indexes = []
-            for _ in range(vertex_size):
-                indexes.append(self.get_next_int_text())
-            mesh.faces.append(indexes)
-        
-        brace_count = self.text_brace_count
-        
-        token = self.get_next_token_text()
-        while token != None and self.text_brace_count >= brace_count:
-            if brace_count == self.text_brace_count:
-                if token == "MeshMaterialList":
-                    self.parse_mesh_material_list_text(mesh)
-                elif token == "MeshTextureCoords":
-                    self.parse_mesh_texture_coords_text(mesh)
-            token = self.get_next_token_text()
-
-    def parse_mesh_texture_coords_text(self, mesh: XModelMesh):
-        object_name = self.get_object_name_text()
-        vertex_size = self.get_next_int_text()
-        for _ in range(vertex_size):
-            uv = [self.get_next_float_text(), self.get_next_float_text()]
-            mesh.tex_coords.append(uv)
-
-    def parse_mesh_material_list_text(self, mesh: XModelMesh):
-        object_name = self.get_object_name_text()
-        mesh.material_count = self.get_next_int_text()
-        face_count = self.get_next_int_text()
-        for _ in range(face_count):
-            mesh.material_face_indexes.append(self.get_next_int_text())
-        
-        brace_count = self.text_brace_count
-        token = self.get_next_token_text()
-        while token != None and self.text_brace_count >= brace_count:
-            if brace_count == self.text_brace_count:
-                if token == "Material":
-                    self.parse_material_text(mesh)
-            token = self.get_next_token_text()
-
-    def parse_material_text(self, mesh: XModelMesh):
-        object_name = self.get_object_name_text()
-        color = (self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text())
-        power = self.get_next_float_text()
-        specular_color = (self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text())
-        self.skip_next_token_text(";")
-        emissive_color = (self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text())
-        material = XMaterial()
-        material.face_color = color
-        material.power = power
-        material.specular_color = specular_color
-        material.emission_color = emissive_color
-        material.name = object_name
-
-        brace_count = self.text_brace_count
-        token = self.get_next_token_text()
-        while token != None and self.text_brace_count >= brace_count:
-            if brace_count == self.text_brace_count:
-                if token == "TextureFilename":
-                    material.texture_path = self.get_next_string_text()
-                    self.skip_next_token_text(";")
-            token = self.get_next_token_text()
-        mesh.materials.append(material)
-    
-    def parse_frame_text(self, node: XModelNode):
-        child = XModelNode()
-        child.node_name = self.get_object_name_text()
-
-        brace_count = self.text_brace_count
-        token = self.get_next_token_text()
-        while token != None and self.text_brace_count >= brace_count:
-            if brace_count == self.text_brace_count:
-                if token == "FrameTransformMatrix":
-                    self.skip_until_text("{")
-                    matrix = [
-                        [self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text()],
-                        [self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text()],
-                        [self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text()],
-                        [self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text()]
-                    ]
-                    child.transform_matrix = mathutils.Matrix(matrix)
-                    self.skip_until_text("}")
-                elif token == "Mesh":
-                    self.parse_mesh_text(child.mesh)
-                elif token == "Frame":
-                    c = XModelNode()
-                    self.parse_frame_text(c)
-                    node.children.append(c)
-            token = self.get_next_token_text()
-        node.children.append(child)
-    
-    def get_next_token_text(self):
-        start = False
-        ret = ""
-        while self.text_pos < len(self.text_content):
-            # comment
-            if len(self.text_content) + 1 < self.text_pos and self.text_content[self.text_pos] == '/' and self.text_content[len(self.text_content) + 1] == '/' or \
-                    self.text_content[self.text_pos] == '#':
-                while self.text_pos < len(self.text_content):
-                    if self.text_content[self.text_pos] == '\n' or self.text_content[self.text_pos] == '\r':
-                        break
-                    self.text_pos += 1
-            if self.is_ascii(self.text_content[self.text_pos]):
-                start = True
-                c = self.text_content[self.text_pos]
-                if c == "{" or c == "}" or c == "[" or c == "]" or  c == ";" or c == "," or c == '"':
-                    if len(ret) == 0:
-                        if c == "{":
-                            self.text_brace_count += 1
-                        elif c == "}":
-                            self.text_brace_count -= 1
-                        ret += c
-                        self.text_pos += 1
-                    return ret
-                ret += c
-            elif start:
-                break
-
-            self.text_pos += 1
-        
-        if len(ret) == 0:
-            return None
-        
-        return ret
-
-    def skip_until_text(self, target):
-        token = ""
-        while True:
-            token = self.get_next_token_text()
-            if token == target:
-                break
-    
-    def skip_next_token_text(self, expected):
-        token = self.get_next_token_text()
-        if token != expected:
-            raise Exception(f"Unexpected token: {token}")
-        
-    def get_next_int_text(self):
-        token = self.get_next_token_text()
-        while token == ";" or token == ",":
-            token = self.get_next_token_text()
-        
-        if token == None:
-            raise Exception("Unexpected end of file")
-        
-        return int(token)
-        
-    def get_next_float_text(self):
-        token = self.get_next_token_text()
-        while token == ";" or token == ",":
-            token = self.get_next_token_text()
-        
-        if token == None:
-            raise Exception("Unexpected end of file")
-        
-        return float(token)
-
-    def get_next_string_text(self):
-        self.skip_until_text('"')
-        ret = ""
-        while self.text_pos < len(self.text_content):
-            if self.text_content[self.text_pos] == '\\':
-                self.text_pos += 1
-            elif self.text_content[self.text_pos] == '"':
-                self.text_pos += 1
-                break
-            else:
-                ret += self.text_content[self.text_pos]
-            self.text_pos += 1
-        if len(ret) == 0:
-            return None
-        return ret
+    frame_names: StringProperty(
+        name="Frames to import",
+        description="Comma separated names of the frames to import. All frames and meshes are imported if empty",
+        default="",
+    )
 
-    def get_object_name_text(self):
-        token = self.get_next_token_text()
-        if token == "{":
-            return None
-        self.skip_next_token_text("{")
-        return token
-
-    def is_ascii(self, c):
-        return ord(c) <= 255 and ord(c) != ord(' ') and ord(c) != ord('\r') and ord(c) != ord('\n') and ord(c) != ord('\t')
-
-    def parse_token(self):
-        token = self.byte_buffer.get_short()
-        if token == TOKEN_NAME:
-            length = self.byte_buffer.get_int()
-            self.ret_string = self.byte_buffer.get_length(length).decode()
-        elif token == TOKEN_INTEGER:
-            self.ret_integer = self.byte_buffer.get_int()
-        elif token == TOKEN_STRING:
-            length = self.byte_buffer.get_int()
-            self.ret_string = self.byte_buffer.get_length(length).decode()
-            self.parse_token()
-        elif token == TOKEN_GUID:
-            # GUIDは使用しないため無視する / Ignore GUID as it is not used
-            self.byte_buffer.get_int()
-            self.byte_buffer.get_short()
-            self.byte_buffer.get_short()
-            self.byte_buffer.get_length(8)
-        elif token == TOKEN_INTEGER_LIST:
-            length = self.byte_buffer.get_int()
-            self.ret_integer_list = [0] * length
-            for i in range(length):
-                self.ret_integer_list[i] = self.byte_buffer.get_int()
-        elif token == TOKEN_FLOAT_LIST:
-            length = self.byte_buffer.get_int()
-            self.ret_float_list = [0.0] * length
-            if self.float_size == 64:
-                for i in range(length):
-                    self.ret_float_list[i] = self.byte_buffer.get_double()
-            else:
-                for i in range(length):
-                    self.ret_float_list[i] = self.byte_buffer.get_float()
-        elif token == TOKEN_TEMPLATE:
-            # テンプレートは使用する必要がないため無視する / Ignore templates as they are not needed
-            self.parse_token_loop(TOKEN_CBRACE)
-        elif token == TOKEN_OBRACE:
-            self.bin_brace_count += 1
-        elif token == TOKEN_CBRACE:
-            self.bin_brace_count -= 1
-        return token
-
-    def parse_token_loop(self, token):
-        while self.parse_token() != token:
-            pass
+    materials_only: BoolProperty(
+        name="Import only materials",
+        description="Import only the materials of the file without creating objects",
+        default=False,
+    )
 
-    def parse_bin(self) -> XModelNode:
-        root_node = XModelNode()
-        while self.byte_buffer.has_remaining():
-            token = self.parse_token()
-            if token == TOKEN_NAME:
-                if self.ret_string == "Mesh":
-                    self.parse_mesh_bin(root_node.mesh)
-                elif self.ret_string == "Material":
-                    self.parse_material_bin(root_node.mesh)
-                elif self.ret_string == "Frame":
-                    self.parse_frame_bin(root_node)
-        return root_node
-
-    def parse_mesh_bin(self, mesh: XModelMesh):
-        self.parse_token_loop(TOKEN_INTEGER_LIST)
-        self.parse_token_loop(TOKEN_FLOAT_LIST)
-        mesh.vertices = []
-        i = 0
-        vertex_index = 0
-        while vertex_index < self.ret_integer_list[0]:
-            vertex = self.ret_float_list[i:i + 3]
-            mesh.vertices.append(vertex)
-            vertex_index += 1
-            i += 3
-        self.parse_token_loop(TOKEN_INTEGER_LIST)
-        mesh.faces = []
-        i = 1
-        while i < len(self.ret_integer_list):
-            length = self.ret_integer_list[i]
-            indexes = self.ret_integer_list[i + 1:i + 1 + length]
-            mesh.faces.append(indexes)
-            i += length + 1
-        
-        brace_count = self.bin_brace_count
-        token = self.parse_token()
-        while brace_count <= self.bin_brace_count:
-            if brace_count == self.bin_brace_count and token == TOKEN_NAME:
-                if self.ret_string == "MeshTextureCoords":
-                    self.parse_mesh_texture_coords_bin(mesh)
-                elif self.ret_string == "MeshMaterialList":
-                    self.parse_mesh_material_list_bin(mesh)
-            token = self.parse_token()
-
-    def parse_mesh_texture_coords_bin(self, mesh: XModelMesh):
-        self.parse_token_loop(TOKEN_INTEGER_LIST)
-        self.parse_token_loop(TOKEN_FLOAT_LIST)
-        i = 0
-        while i < len(self.ret_float_list):
-            vertex = [self.ret_float_list[i], self.ret_float_list[i + 1]]
-            mesh.tex_coords.append(vertex)
-            i += 2
-
-    def parse_mesh_material_list_bin(self, mesh: XModelMesh):
-        self.parse_token_loop(TOKEN_INTEGER_LIST)
-        mesh.material_count = self.ret_integer_list[0]
-        mesh.material_face_indexes = self.ret_integer_list[2:self.ret_integer_list[1] + 2]
-        pos = self.byte_buffer.pos
-        while True:
-            token = self.parse_token()
-            if token == TOKEN_NAME and self.ret_string == "Material":
-                self.parse_material_bin(mesh)
-            else:
-                self.byte_buffer.pos = pos
-                break
-            pos = self.byte_buffer.pos
-
-    def parse_material_bin(self, mesh: XModelMesh):
-        token = self.parse_token()
-        material_name = ""
-        if token == TOKEN_NAME:
-            material_name = self.ret_string
-        self.parse_token_loop(TOKEN_FLOAT_LIST)
-        material = XMaterial()
-        material.name = material_name
-        material.face_color = (self.ret_float_list[0], self.ret_float_list[1], self.ret_float_list[2], self.ret_float_list[3])
-        material.power = self.ret_float_list[4]
-        material.specular_color = (self.ret_float_list[5], self.ret_float_list[6], self.ret_float_list[7])
-        material.emission_color = (self.ret_float_list[8], self.ret_float_list[9], self.ret_float_list[10])
-        token = self.parse_token()
-        if token == TOKEN_NAME and self.ret_string == "TextureFilename":
-            self.parse_token_loop(TOKEN_STRING)
-            material.texture_path = self.ret_string
-            self.parse_token_loop(TOKEN_CBRACE)
-        if token != TOKEN_CBRACE:
-            self.parse_token_loop(TOKEN_CBRACE)
-        mesh.materials.append(material)
-    
-    def parse_frame_bin(self, node: XModelNode):
-        child = XModelNode()
-        token = self.parse_token()
-        name = ""
-        if token == TOKEN_NAME:
-            name = self.ret_string
-        child.node_name = name
-        brace_count = self.bin_brace_count
-        token = self.parse_token()
-        while brace_count<= self.bin_brace_count:
-            if brace_count == self.bin_brace_count and token == TOKEN_NAME:
-                if self.ret_string == "FrameTransformMatrix":
-                    matrix = [
-                        self.ret_float_list[0:4],
-                        self.ret_float_list[4:8],
-                        self.ret_float_list[8:12],
-                        self.ret_float_list[12:16]
-                    ]
-                    child.transform_matrix = mathutils.Matrix(matrix)
-                elif self.ret_string == "Mesh":
-                    self.parse_mesh_bin(child.mesh)
-                elif self.ret_string == "Frame":
-                    c = XModelNode()
-                    self.parse_frame_bin(c)
-                    child.children.append(c)
-        node.children.append(child)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.initialize()
 
     def execute(self, context):
         # すべてのオブジェクトとマテリアルを削除 / Delete all objects and materials
         if self.remove_all:
-            for obj in bpy.context.scene.objects:
-                if obj.type == 'MESH':
-                    bpy.data.objects.remove(obj)
-            for material in bpy.data.materials:
-                material.user_clear()
-                bpy.data.materials.remove(material)
+            self.remove_all_objects_and_materials()
 
         self.initialize()
         # xファイルを読み込み / Load x file
-        with open(self.filepath, "rb") as f:
-            header = f.read(16)
-            if header[0:4] == b'xof ':
-                # フォーマットのチェック
-                self.is_compressed = False
-                if header[8:12] == b'txt ':
-                    self.is_binary = False
-                elif header[8:12] == b'bin ':
-                    self.is_binary = True
-                elif header[8:12] == b'bzip':
-                    self.is_binary = True
-                    self.is_compressed = True
-                self.float_size = int(header[12:16].decode())
-            else:
-                raise Exception(bpy.app.translations.pgettext("This file is not X file!"))
+        try:
+            root_node = self.get_parse_function(context)()
+        except XFileFormatError as e:
+            raise Exception(bpy.app.translations.pgettext(str(e)))
+        self.report_parse_warnings(root_node)
+
+        # シーンにリンクしていない新しいコレクションに作成し、最後にシーンにリンクする(追加のたびにビューレイヤーを更新させない) /
+        #  Create into a new collection that is not linked to the scene, and link it at the end (so that each addition does not update the view layer)
+        self.collection = bpy.data.collections.new(os.path.basename(self.filepath))
+        try:
+            self.create_objects(root_node)
+            self.link_collection(context)
+        finally:
+            self.collection = None
 
-        if self.is_binary:
-            # バイナリ / Binary
+        return {'FINISHED'}
 
-            # flate圧縮 / Flate compression
-            if self.is_compressed:
-                with open(self.filepath, "rb") as f:
-                    f.read(16)
-                    raw_data = f.read()
-                    compressed_byte_buffer = utility.ByteBuffer(raw_data)
-                    MSZIP_BLOCK = 0x8000
-                    MSZIP_MAGIC = int.from_bytes("CK".encode(), byteorder='little')
-
-                    unzipped_size = compressed_byte_buffer.get_int()
-
-                    self.byte_buffer = utility.ByteBuffer(bytes())
-                    while compressed_byte_buffer.has_remaining():
-                        uncompressed_size = compressed_byte_buffer.get_short()
-                        block_size = compressed_byte_buffer.get_short()
-                        magic = compressed_byte_buffer.get_short()
-                        if block_size > MSZIP_BLOCK:
-                            raise Exception(bpy.app.translations.pgettext("Unexpected compressed block size!"))
-                        if magic != MSZIP_MAGIC:
-                            raise Exception(bpy.app.translations.pgettext("Unexpected compressed block magic!"))
-                        compressed_data = compressed_byte_buffer.get_length(block_size - 2)
-                        self.byte_buffer.append(zlib.decompress(compressed_data, -8, MSZIP_BLOCK))
-            else:
-                with open(self.filepath, "rb") as f:
-                    f.read(16)
-                    data = f.read()
-                    self.byte_buffer = utility.ByteBuffer(data)
-            root_node = self.parse_bin()
-        else:
-            # テキスト / Text
-            with open(self.filepath) as f:
-                x_model_file_string = f.read()
-                self.text_content = x_model_file_string
-
-                root_node = XModelNode()
-
-                token = self.get_next_token_text()
-                while token != None:
-                    if self.text_brace_count == 0:
-                        if token == "template":
-                            self.get_next_token_text()
-                        elif token == "Mesh":
-                            self.parse_mesh_text(root_node.mesh)
-                        elif token == "Material":
-                            self.parse_material_text(root_node.mesh)
-                        elif token == "Frame":
-                            self.parse_frame_text(root_node)
-                    token = self.get_next_token_text()
-
-        self.create_obj_from_node(mathutils.Matrix.Identity(4), root_node)
+    # 設定に従ってファイルを解析する関数を返す(bpyに触れないため、別のスレッドからも呼べる) /
+    #  Return a function that parses the file according to the settings (it does not touch bpy, so it can be called from another thread)
+    # progress: 別のスレッドで解析する場合の進捗と中止の要求 / Progress and cancellation request when parsing in another thread
+    def get_parse_function(self, context, progress=None):
+        # 変更されていないファイルは解析キャッシュから読み込む / Load unchanged files from the parse cache
+        cache = get_parse_cache(context)
+        # 指定したフレームだけを読み込む / Load only the specified frames
+        frame_names = {name.strip() for name in self.frame_names.split(",") if name.strip()} or None
+        parse = cache.parse if cache is not None else parse_x_file
+        return functools.partial(parse, self.filepath, self.stream_decompression, frame_names, self.materials_only, progress)
+
+# UIを止めずにインポートする(進捗を表示し、ESCで中止できる) / Import without freezing the UI (shows progress and can be cancelled with ESC)
+# 解析は別のスレッドで行い、オブジェクトはタイマーごとに少しずつ作成する / Parsing runs in another thread, and objects are created little by little on each timer
+class ImportDirectXXFileModal(ImportDirectXXFile):
+    bl_idname = "import.directx_x_modal_for_bve"
+    bl_description = 'Import from X file (.x) in the background without freezing the UI'
+    bl_label = "Import DirectX X File (Background)"
 
+    def execute(self, context):
+        self.initialize()
+        self.phase_times = []
+        self.phase_start = time.perf_counter()
+        # 中止したときに削除するため、インポート前にあったデータを記録する / Record the data that existed before the import to remove new data when cancelled
+        self.existing_ids = {id.session_uid for id in self.get_rollback_ids()}
+
+        # 別のスレッドで解析する / Parse in another thread
+        self.parse_result = {}
+        self.parse_progress = XParseProgress()
+        parse = self.get_parse_function(context, self.parse_progress)
+        def parse_in_thread(result=self.parse_result):
+            try:
+                result["root_node"] = parse()
+            except Exception as e:
+                result["error"] = e
+        self.parse_thread = threading.Thread(target=parse_in_thread, daemon=True)
+        self.parse_thread.start()
+        self.creation_steps = None
+
+        wm = context.window_manager
+        self.timer = wm.event_timer_add(MODAL_TIMER_INTERVAL, window=context.window)
+        wm.modal_handler_add(self)
+        wm.progress_begin(0, 100)
+        self.shown_phase = None
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.rollback()
+            self.finish(context)
+            self.report({'WARNING'}, bpy.app.translations.pgettext("Import cancelled"))
+            return {'CANCELLED'}
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        try:
+            if self.creation_steps is None:
+                if self.parse_thread.is_alive():
+                    # 解析スレッドの段階とその進み具合を表示する / Show the phase of the parse thread and its progress
+                    phase = self.parse_progress.phase
+                    if phase != self.shown_phase and phase in PARSE_PHASE_STATUS:
+                        self.set_status(context, PARSE_PHASE_STATUS[phase])
+                        self.shown_phase = phase
+                    context.window_manager.progress_update(int(self.parse_progress.fraction * 100))
+                    return {'PASS_THROUGH'}
+                if "error" in self.parse_result:
+                    raise self.parse_result["error"]
+                self.phase_times.extend(self.parse_progress.phase_times)
+                self.phase_start = time.perf_counter()
+                root_node = self.parse_result.pop("root_node")
+                self.report_parse_warnings(root_node)
+                self.collection = bpy.data.collections.new(os.path.basename(self.filepath))
+                self.creation_steps = self.create_objects_iter(root_node)
+                self.set_status(context, "Creating objects")
+
+            # 決めた時間だけオブジェクトを作成して、UIに制御を返す / Create objects for a fixed time and then return control to the UI
+            deadline = time.perf_counter() + MODAL_TIME_SLICE
+            while time.perf_counter() < deadline:
+                done, total = next(self.creation_steps)
+                context.window_manager.progress_update(done * 100 // max(total, 1))
+            return {'RUNNING_MODAL'}
+        except StopIteration:
+            pass
+        except Exception as e:
+            self.rollback()
+            self.finish(context)
+            self.report({'ERROR'}, bpy.app.translations.pgettext(str(e)))
+            return {'CANCELLED'}
+
+        self.end_phase("Create objects")
+        # すべて作成できてから元のオブジェクトとマテリアルを削除する(中止した場合は残す) /
+        #  Remove the original objects and materials only after everything was created (they are kept when cancelled)
+        if self.remove_all:
+            bpy.data.batch_remove(
+                [obj for obj in context.scene.objects if obj.type == 'MESH' and obj.session_uid in self.existing_ids]
+                + [material for material in bpy.data.materials if material.session_uid in self.existing_ids]
+            )
+        self.link_collection(context)
+        self.collection = None
+        self.end_phase("Link to scene")
+        self.finish(context)
+        self.report({'INFO'}, ", ".join(f"{bpy.app.translations.pgettext(name)} {seconds:.2f}s" for name, seconds in self.phase_times))
         return {'FINISHED'}
 
+    # ファイルを閉じるなどでBlenderから中止された場合 / When cancelled by Blender, e.g. when the file is closed
+    def cancel(self, context):
+        self.finish(context)
+
+    def set_status(self, context, phase):
+        context.workspace.status_text_set(f"{bpy.app.translations.pgettext(phase)}... ({bpy.app.translations.pgettext('Esc to cancel')})")
+
+    def end_phase(self, name):
+        now = time.perf_counter()
+        self.phase_times.append((name, now - self.phase_start))
+        self.phase_start = now
+
+    def finish(self, context):
+        # 解析中であれば中止して、スレッドの終了を待つ / If still parsing, cancel it and wait for the thread to end
+        self.parse_progress.cancel()
+        self.parse_thread.join()
+        wm = context.window_manager
+        wm.event_timer_remove(self.timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+
+    # 中止したときに削除する種類のデータ / Kinds of data removed when cancelled
+    def get_rollback_ids(self):
+        for data in (bpy.data.objects, bpy.data.meshes, bpy.data.materials, bpy.data.images, bpy.data.collections):
+            yield from data
+
+    # インポート中に作成したデータ / Data created during the import
+    def get_new_ids(self):
+        return [id for id in self.get_rollback_ids() if id.session_uid not in self.existing_ids]
+
+    # インポート中に作成したデータをすべて削除する / Remove all data created during the import
+    def rollback(self):
+        self.creation_steps = None
+        self.collection = None
+        bpy.data.batch_remove(self.get_new_ids())
+
+# ディレクトリ内のXファイルをまとめてインポート / Import X files in a directory at once
+class ImportDirectXXDirectory(bpy.types.Operator, ImportHelper, XObjectCreator):
+    bl_idname = "import.directx_x_directory_for_bve"
+    bl_description = 'Import all X files (.x) in a directory'
+    bl_label = "Import DirectX X Files in Directory"
+    bl_space_type = 'PROPERTIES'
+    bl_region_type = 'WINDOW'
+    bl_options = {'UNDO'}
+
+    directory: StringProperty(
+        name="input directory",
+        subtype='DIR_PATH'
+    )
+
+    filter_glob: StringProperty(
+        default="*.x",
+        options={'HIDDEN'},
+    )
+
+    file_pattern: StringProperty(
+        name="File pattern",
+        description="Pattern of the files to import, relative to the directory",
+        default="**/*.x",
+    )
+
+    remove_all: BoolProperty(
+        name="Remove All Objects and Materials",
+        default=False,
+    )
+
+    scale: FloatProperty(
+        name="Scale",
+        default=1.0
+    )
+
+    gamma_correction: BoolProperty(
+        name="Gamma correction",
+        default=True,
+    )
+
+    stream_decompression: BoolProperty(
+        name="Decompress while parsing",
+        description="Parse compressed binary files while they are being decompressed",
+        default=False,
+    )
+
+    share_materials: BoolProperty(
+        name="Share identical materials",
+        description="Use one material for materials with the same color, specular, emission and texture",
+        default=True,
+    )
+
+    single_object: BoolProperty(
+        name="One object per mesh",
+        description="Import each mesh as one object with material slots instead of one object per material",
+        default=False,
+    )
+
+    defer_textures: BoolProperty(
+        name="Defer texture loading",
+        description="Create textures without reading the image files. Each image is read when it is first displayed",
+        default=False,
+    )
+
+    share_materials_across_files: BoolProperty(
+        name="Share materials across files",
+        description="Also share identical materials between different files",
+        default=True,
+    )
+
+    worker_count: IntProperty(
+        name="Worker processes",
+        description="Number of processes used to parse files (0: number of CPU cores)",
+        default=0,
+        min=0,
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.initialize()
+
+    def execute(self, context):
+        directory = bpy.path.abspath(self.directory)
+        file_paths = sorted(
+            path for path in glob.glob(os.path.join(glob.escape(directory), self.file_pattern), recursive=True)
+            if os.path.isfile(path)
+        )
+        if len(file_paths) == 0:
+            self.report({'WARNING'}, bpy.app.translations.pgettext("No X files were found"))
+            return {'CANCELLED'}
+
+        # すべてのオブジェクトとマテリアルを削除 / Delete all objects and materials
+        if self.remove_all:
+            self.remove_all_objects_and_materials()
+
+        self.initialize()
+        start = time.perf_counter()
+
+        # ファイルごとのコレクションを先に作り、結果の到着順に関わらず並びを固定する /
+        #  Create the collection for each file first so that the order does not depend on the order in which results arrive
+        # ルートのコレクションは最後にシーンにリンクし、追加のたびにビューレイヤーを更新させない /
+        #  The root collection is linked to the scene at the end, so that each addition does not update the view layer
+        root_collection = bpy.data.collections.new(os.path.basename(os.path.normpath(directory)))
+        collections = {}
+        for path in file_paths:
+            collection = bpy.data.collections.new(os.path.relpath(path, directory))
+            root_collection.children.link(collection)
+            collections[path] = collection
+
+        wm = context.window_manager
+        wm.progress_begin(0, len(file_paths))
+        imported_count = 0
+        try:
+            for index, (path, result) in enumerate(self.parse_files(file_paths, get_parse_cache(context))):
+                collection = collections[path]
+                if isinstance(result, Exception):
+                    # 読み込めなかったファイルは報告して次へ / Report files that could not be read and move on
+                    self.report({'WARNING'}, f"{os.path.relpath(path, directory)}: {bpy.app.translations.pgettext(str(result))}")
+                    bpy.data.collections.remove(collection)
+                else:
+                    root_node, parse_time = result
+                    self.report_parse_warnings(root_node, f"{os.path.relpath(path, directory)}: ")
+                    create_start = time.perf_counter()
+                    if not self.share_materials_across_files:
+                        self.shared_materials = {}
+                    self.filepath = path
+                    self.collection = collection
+                    self.create_objects(root_node)
+                    create_time = time.perf_counter() - create_start
+                    self.report({'INFO'}, f"{os.path.relpath(path, directory)}: parse {parse_time:.3f}s, create {create_time:.3f}s")
+                    imported_count += 1
+                wm.progress_update(index + 1)
+        finally:
+            wm.progress_end()
+            self.collection = None
+            context.scene.collection.children.link(root_collection)
+
+        self.report({'INFO'}, f"{imported_count}/{len(file_paths)} files, {time.perf_counter() - start:.2f}s")
+        return {'FINISHED'}
+
+    # ファイルを並列に解析し、終わったものから(パス, (ルートノード, 解析時間)または例外)を返す /
+    #  Parse files in parallel and yield (path, (root node, parse time) or exception) as each one finishes
+    def parse_files(self, file_paths, cache):
+        worker_count = self.worker_count if self.worker_count > 0 else os.cpu_count() or 1
+        worker_count = min(worker_count, len(file_paths))
+        remaining = list(file_paths)
+        if worker_count > 1:
+            try:
+                with direct_x_parser.create_process_pool(worker_count) as executor:
+                    futures = {
+                        executor.submit(direct_x_parser.parse_x_file_timed, path, self.stream_decompression, cache): path
+                        for path in file_paths
+                    }
+                    for future in concurrent.futures.as_completed(futures):
+                        path = futures[future]
+                        try:
+                            result = future.result()
+                        except BrokenProcessPool:
+                            raise
+                        except Exception as e:
+                            result = e
+                        remaining.remove(path)
+                        yield path, result
+            except BrokenProcessPool:
+                # ワーカープロセスを使えない場合は残りをこのプロセスで解析する / If worker processes cannot be used, parse the rest in this process
+                pass
+        for path in remaining:
+            try:
+                result = direct_x_parser.parse_x_file_timed(path, self.stream_decompression, cache)
+            except Exception as e:
+                result = e
+            yield path, result
+
 # Xファイルに出力 / Export to X file
 class ExportDirectXXFile(bpy.types.Operator, ExportHelper):
     bl_idname = "export.directx_x_for_bve"
@@ -916,6 +900,30 @@ class ExportDirectXXFile(bpy.types.Operator, ExportHelper):
         default=True,
     )
 
+    weld_position_tolerance: FloatProperty(
+        name="Position weld tolerance",
+        description="Vertex positions are rounded to multiples of this value when merging vertices (0: merge only identical positions)",
+        default=0.0,
+        min=0.0,
+        precision=6,
+    )
+
+    weld_normal_tolerance: FloatProperty(
+        name="Normal weld tolerance",
+        description="Normals are rounded to multiples of this value when merging normals (0: merge only identical normals)",
+        default=0.0,
+        min=0.0,
+        precision=6,
+    )
+
+    weld_uv_tolerance: FloatProperty(
+        name="UV weld tolerance",
+        description="UVs are rounded to multiples of this value when merging vertices",
+        default=0.0001,
+        min=0.0,
+        precision=6,
+    )
+
     use_emissive_power: BoolProperty(
         name="Use emissive power",
         description="Multiply emissive color by emissive power",
@@ -931,7 +939,9 @@ class ExportDirectXXFile(bpy.types.Operator, ExportHelper):
 
         # ModelDataUtilityでBlenderのデータを整形 / Format Blender data with ModelDataUtility
         model_data_utility = ModelDataUtility()
-        model_data_utility.execute(context, export_selected_only=self.export_selected_only, scale=self.scale, gamma_correction=self.gamma_correction)
+        model_data_utility.execute(context, export_selected_only=self.export_selected_only, scale=self.scale, gamma_correction=self.gamma_correction,
+                                   position_tolerance=self.weld_position_tolerance, normal_tolerance=self.weld_normal_tolerance, uv_tolerance=self.weld_uv_tolerance,
+                                   cache=get_export_cache(context))
         vertexes = model_data_utility.vertexes
         normals = model_data_utility.normals
         vertex_use_normal = model_data_utility.vertex_use_normal
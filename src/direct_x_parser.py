@@ -0,0 +1,1152 @@
+import array
+import functools
+import mmap
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from typing import Self
+
+from . import utility
+
+# Xファイルの解析処理(bpyに依存しないため、Blenderの外やワーカープロセスからも使用できる) /
+#  X file parsing (does not depend on bpy, so it can also be used outside Blender and from worker processes)
+
+TOKEN_NAME = 1
+TOKEN_STRING = 2
+TOKEN_INTEGER = 3
+TOKEN_GUID = 5
+TOKEN_INTEGER_LIST = 6
+TOKEN_FLOAT_LIST = 7
+
+TOKEN_OBRACE = 0x0A
+TOKEN_CBRACE = 0x0B
+TOKEN_OPAREN = 0x0C
+TOKEN_CPAREN = 0x0D
+TOKEN_OBRACKET = 0x0E
+TOKEN_CBRACKET = 0x0F
+TOKEN_OANGLE = 0x10
+TOKEN_CANGLE = 0x11
+TOKEN_DOT = 0x12
+TOKEN_COMMA = 0x13
+TOKEN_SEMICOLON = 0x14
+TOKEN_TEMPLATE = 0x1F
+TOKEN_WORD = 0x28
+TOKEN_DWORD = 0x29
+TOKEN_FLOAT = 0x2A
+TOKEN_DOUBLE = 0x2B
+TOKEN_CHAR = 0x2C
+TOKEN_UCHAR = 0x2D
+TOKEN_SWORD = 0x2E
+TOKEN_SDWORD = 0x2F
+TOKEN_VOID = 0x30
+TOKEN_LPSTR = 0x31
+TOKEN_UNICODE = 0x32
+TOKEN_CSTRING = 0x33
+TOKEN_ARRAY = 0x34
+
+# テキスト形式のトークン / Tokens of the text format
+# 空白、Latin-1以外の文字、コメントを読み飛ばし、区切り文字か名前・数値を1つ読み取る /
+#  Skip whitespace, non Latin-1 characters and comments, then read a delimiter or a name/number
+TEXT_TOKEN_PATTERN = re.compile(
+    r'[ \t\r\n\u0100-\U0010ffff]*+(?:(?:#|//)[^\r\n]*+[ \t\r\n\u0100-\U0010ffff]*+)*+'
+    r'([{}\[\];,"]|(?!//)[^ \t\r\n\u0100-\U0010ffff{}\[\];,"#]++)'
+)
+# 文字列の残り(閉じる"まで) / The rest of a string (up to the closing ")
+TEXT_STRING_PATTERN = re.compile(r'((?:[^"\\]|\\.)*)"?', re.DOTALL)
+TEXT_ESCAPE_PATTERN = re.compile(r'\\.', re.DOTALL)
+# 数値ブロック用(ASCII以外を含むブロックは1トークンずつ読む) / For numeric blocks (blocks containing non-ASCII are read token by token)
+TEXT_SEPARATOR_SOURCE = r'[ \t\r\n;,]*+(?:(?:#|//)[^\r\n]*+[ \t\r\n;,]*+)*+'
+TEXT_NUMBER_SOURCE = r'(?!//)[^ \t\r\n{}\[\];,"#]++'
+TEXT_INTEGER_RUN_PATTERN = re.compile(r'(?:' + TEXT_SEPARATOR_SOURCE + r'[-+]?[0-9]++)*+')
+TEXT_COMMENT_PATTERN = re.compile(r'(?:#|//)[^\r\n]*')
+
+# count個の数値とその前の区切り文字にマッチするパターン / Pattern matching count numbers and the separators before them
+@functools.lru_cache(maxsize=64)
+def text_number_block_pattern(count):
+    return re.compile(r'(?:' + TEXT_SEPARATOR_SOURCE + TEXT_NUMBER_SOURCE + r'){' + str(count) + r'}')
+
+# 進捗を記録しながらファイルを読み込む単位 / Unit for reading files while recording progress
+READ_CHUNK_SIZE = 1 << 22
+
+# 単位行列(行のタプル) / Identity matrix (tuple of rows)
+IDENTITY_MATRIX = (
+    (1.0, 0.0, 0.0, 0.0),
+    (0.0, 1.0, 0.0, 0.0),
+    (0.0, 0.0, 1.0, 0.0),
+    (0.0, 0.0, 0.0, 1.0),
+)
+
+# 参照({ Name })の前に来るトークン / Tokens that come before a reference ({ Name })
+TEXT_REFERENCE_PRECEDING_TOKENS = ("{", "}", ";", ",")
+BIN_REFERENCE_PRECEDING_TOKENS = (TOKEN_OBRACE, TOKEN_CBRACE, TOKEN_SEMICOLON, TOKEN_COMMA, TOKEN_INTEGER_LIST, TOKEN_FLOAT_LIST)
+
+# Xファイルの形式が正しくない場合のエラー / Error raised when the X file format is invalid
+class XFileFormatError(Exception):
+    pass
+
+# 別のスレッドで解析するときの進捗と中止の要求 / Progress and cancellation request when parsing in another thread
+# 読み込み、展開、解析の段階ごとに進捗を記録し、中止されていればCancelledErrorを送出する /
+#  Progress is recorded per phase (read, decompress, parse), and CancelledError is raised if cancelled
+class XParseProgress:
+    def __init__(self):
+        self.cancel_event = threading.Event()
+        # 現在の段階("Read"、"Decompress"、"Parse"など、終わった場合は"") / Current phase ("Read", "Decompress", "Parse" etc., "" when finished)
+        self.phase = ""
+        # 現在の段階の進み具合(0.0～1.0) / Progress of the current phase (0.0 to 1.0)
+        self.fraction = 0.0
+        # 終わった段階の(名前, 秒数) / (Name, seconds) of the finished phases
+        self.phase_times: list[tuple[str, float]] = []
+        self.phase_start = 0.0
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise CancelledError("Parsing was cancelled")
+
+    # 前の段階の時間を記録して次の段階を始める(""の場合は終了する) / Record the time of the previous phase and start the next one (finish if "")
+    def start_phase(self, phase):
+        self.check_cancelled()
+        now = time.perf_counter()
+        if self.phase:
+            self.phase_times.append((self.phase, now - self.phase_start))
+        self.phase = phase
+        self.fraction = 0.0
+        self.phase_start = now
+
+class XModelMesh:
+    # 大きなメッシュでもメモリを抑えるため、頂点やUVは平坦な配列に、面はインデックスとオフセットの配列に格納する /
+    #  To keep memory low for large meshes, vertices and UVs are stored in flat arrays, and faces in arrays of indexes and offsets
+    __slots__ = (
+        "positions",
+        "face_indices",
+        "face_offsets",
+        "tex_coords",
+        "normals",
+        "normal_face_indices",
+        "normal_face_offsets",
+        "materials",
+        "material_face_indexes",
+        "material_count",
+    )
+
+    def __init__(self):
+        # x, y, z の順に並んだ頂点座標 / Vertex coordinates in x, y, z order
+        self.positions = array.array('d')
+        # i番目の面の頂点インデックスは face_indices[face_offsets[i]:face_offsets[i + 1]] /
+        #  The vertex indexes of the i-th face are face_indices[face_offsets[i]:face_offsets[i + 1]]
+        self.face_indices = array.array(utility.INT32_TYPECODE)
+        self.face_offsets = array.array(utility.INT32_TYPECODE, [0])
+        # u, v の順に並んだテクスチャ座標 / Texture coordinates in u, v order
+        self.tex_coords = array.array('d')
+        self.normals = array.array('d')
+        self.normal_face_indices = array.array(utility.INT32_TYPECODE)
+        self.normal_face_offsets = array.array(utility.INT32_TYPECODE, [0])
+        self.materials = []
+        self.material_face_indexes = array.array(utility.INT32_TYPECODE)
+        self.material_count = 0
+
+    def get_vertex_count(self):
+        return len(self.positions) // 3
+
+    def get_face_count(self):
+        return len(self.face_offsets) - 1
+
+    # 頂点数が前に付いた面データ(n, i0, ..., in-1, n, ...)を追加する / Add face data prefixed with vertex counts (n, i0, ..., in-1, n, ...)
+    def add_faces(self, values):
+        face_indices = self.face_indices
+        face_offsets = self.face_offsets
+        i = 0
+        while i < len(values):
+            length = values[i]
+            face_indices.extend(values[i + 1:i + 1 + length])
+            face_offsets.append(len(face_indices))
+            i += length + 1
+
+# 同じ座標の頂点を1つにまとめる(座標はscale倍してBlenderの軸の順(X, Z, Y)にする) /
+#  Weld vertices with the same position (positions are multiplied by scale and put in Blender axis order (X, Z, Y))
+# 戻り値: (まとめた座標のリスト, Xファイルの頂点インデックスからそのリストのインデックスを引く辞書) /
+#  Returns: (list of welded positions, dictionary to look up the index in that list from the vertex index of the X file)
+def weld_mesh_positions(mesh: XModelMesh, scale=1.0):
+    mesh_vertexes = []
+    # 座標からmesh_vertexesのインデックスを引く辞書 / Dictionary to look up the index in mesh_vertexes from coordinates
+    mesh_vertexes_index = {}
+    mesh_vertexes_redirect = {}
+    positions = iter(mesh.positions)
+    for vertex_index, (x, y, z) in enumerate(zip(positions, positions, positions)):
+        # DirectX X Y Z
+        # Blender X Z Y
+        vector = (x * scale, z * scale, y * scale)
+        # 重複した座標は1つにまとめる / Combine duplicate coordinates into one
+        # リダイレクト先を登録しておく / Register the redirect destination
+        index = mesh_vertexes_index.get(vector)
+        if index is None:
+            index = len(mesh_vertexes)
+            mesh_vertexes_index[vector] = index
+            mesh_vertexes.append(vector)
+        mesh_vertexes_redirect[vertex_index] = index
+    return mesh_vertexes, mesh_vertexes_redirect
+
+# 指定した面で使う頂点だけを抽出し、Blenderのメッシュに設定する平坦な配列を作る /
+#  Extract only the vertices used by the given faces and build the flat arrays set on a Blender mesh
+# mesh_vertexes, mesh_vertexes_redirect: weld_mesh_positionsの戻り値 / Return values of weld_mesh_positions
+# 戻り値: (頂点座標, ループの頂点インデックス, 面のループの開始位置, ループのUV(UVがない場合は空)) /
+#  Returns: (vertex positions, vertex indexes of loops, loop starts of faces, UVs of loops (empty if there are no UVs))
+def extract_mesh_faces(mesh: XModelMesh, mesh_vertexes, mesh_vertexes_redirect, faces):
+    face_indices = mesh.face_indices
+    face_offsets = mesh.face_offsets
+    mesh_tex_coord = mesh.tex_coords
+    # 頂点データと面データを作成 / Create vertex data and face data
+    # 使用する頂点だけを抽出、その頂点のインデックスに合わせて面の頂点のインデックスを変更 /
+    #  Extract only the vertices used, and change the vertex indexes of the faces to match the indexes of those vertices
+    # mesh_vertexesのインデックスからオブジェクト内の頂点のインデックスを引く辞書 / Dictionary to look up the vertex index in the object from the index in mesh_vertexes
+    mesh_indexes = {}
+    vertex_positions = array.array('f')
+    loop_vertex_indices = array.array('i')
+    loop_starts = array.array('i')
+    loop_uvs = array.array('f')
+    has_uv = len(mesh_tex_coord) > 0
+    for i in faces:
+        loop_starts.append(len(loop_vertex_indices))
+        # Blenderでは面の向きが逆になるので、頂点を逆順に並べる / The face direction is reversed in Blender, so arrange the vertices in reverse order
+        for exact in reversed(face_indices[face_offsets[i]:face_offsets[i + 1]]):
+            k = mesh_vertexes_redirect.get(exact, exact)
+            index = mesh_indexes.get(k)
+            if index is None:
+                index = len(mesh_indexes)
+                mesh_indexes[k] = index
+                vertex_positions.extend(mesh_vertexes[k])
+            loop_vertex_indices.append(index)
+            # UVデータはXファイルに記述された頂点のインデックスで引く / UV data is looked up by the vertex index written in the X file
+            if has_uv:
+                loop_uvs.append(mesh_tex_coord[exact * 2])
+                loop_uvs.append(1.0 - mesh_tex_coord[exact * 2 + 1])
+    return vertex_positions, loop_vertex_indices, loop_starts, loop_uvs
+
+class XModelNode:
+    __slots__ = ("node_name", "transform_matrix", "meshes", "children", "materials", "warnings")
+
+    node_name: str | None
+    transform_matrix: tuple[tuple[float, float, float, float], ...]
+    # 参照({ Name })されたメッシュは複数のノードで同じオブジェクトを共有する / Meshes referenced ({ Name }) share the same object between nodes
+    meshes: list[XModelMesh]
+    children: list[Self]
+    # マテリアルのみを読み込んだ場合のマテリアル(ルートノードのみ) / Materials when only materials were loaded (root node only)
+    materials: list["XMaterial"]
+    # 解析中の警告の(メッセージ, 名前)(ルートノードのみ) / (Message, name) of warnings during parsing (root node only)
+    warnings: list[tuple[str, str]]
+
+    def __init__(self):
+        self.node_name = ""
+        self.transform_matrix = IDENTITY_MATRIX
+        self.meshes = []
+        self.children = []
+        self.materials = []
+        self.warnings = []
+
+# バイナリファイルのデータオブジェクトの索引 / Index of a data object in a binary file
+class XIndexEntry:
+    __slots__ = ("template_name", "object_name", "start", "end", "depth", "children")
+
+    def __init__(self, template_name, object_name, start, depth):
+        self.template_name = template_name
+        self.object_name = object_name
+        # テンプレート名のトークンの位置 / Position of the template name token
+        self.start = start
+        # "}"の次の位置 / Position after "}"
+        self.end = start
+        # "{"の前に開いている括弧の数 / Number of braces open before "{"
+        self.depth = depth
+        self.children: list[XIndexEntry] = []
+
+# 索引のデータオブジェクトを出現順に列挙する / Enumerate indexed data objects in order of appearance
+def iterate_index(entries: list[XIndexEntry]):
+    for entry in entries:
+        yield entry
+        yield from iterate_index(entry.children)
+
+# 指定した名前のフレームだけを残したノードを返す(途中のフレームは変換行列だけを残す) /
+#  Return a node that keeps only the frames with the given names (frames on the way keep only their transform matrix)
+def select_frames(node: XModelNode, frame_names) -> XModelNode:
+    selected = XModelNode()
+    selected.node_name = node.node_name
+    selected.transform_matrix = node.transform_matrix
+    for child in node.children:
+        if child.node_name in frame_names:
+            selected.children.append(child)
+        else:
+            child = select_frames(child, frame_names)
+            if len(child.children) != 0:
+                selected.children.append(child)
+    return selected
+
+class XElement:
+    element_type = ""
+    data = ""
+    children = []
+    end_line_num = 0
+    name = ""
+
+class XMaterial:
+    __slots__ = ("face_color", "power", "specular_color", "emission_color", "texture_path", "name")
+
+    face_color: tuple[float, float, float, float]
+    power: float
+    specular_color: tuple[float, float, float]
+    emission_color: tuple[float, float, float]
+    texture_path: str | None
+    name: str | None
+
+    def __init__(self):
+        self.face_color = (0.0, 0.0, 0.0, 1.0)
+        self.power = 0.0
+        self.specular_color = (0.0, 0.0, 0.0)
+        self.emission_color = (0.0, 0.0, 0.0)
+        self.texture_path = ""
+        self.name = ""
+
+def to_XElement(x_model_file_string, start_line_num):
+    element_type = ""
+    elem_data = ""
+    end_index = 0
+    children = []
+    skip = 0
+    element_name = ""
+    for line_num in range(len(x_model_file_string))[start_line_num:]:
+        if line_num <= skip:
+            continue
+        line = x_model_file_string[line_num]
+        pos = line.find("{")
+        if pos != -1 and "}" in line:
+            continue
+
+        if "{" in line:
+            if element_type == "":
+                element_type = re.sub('\t', "", line[0:line.index("{")])
+                element_type = re.sub('^ *', "", element_type)
+                if element_type.find(" ") != -1:
+                    element_name = element_type[element_type.find(" ") + 1:]
+                    element_type = element_type[0:element_type.find(" ")]
+                    search_result = re.search("[^ ]*", element_name)
+                    if search_result:
+                        element_name = search_result.group(0)
+                if element_type == "":
+                    element_type = "empty"
+            else:
+                x_element = to_XElement(x_model_file_string, line_num)
+                children.append(x_element)
+                skip = x_element.end_line_num
+        else:
+            if "}" in line:
+                end_index = line_num
+                break
+            else:
+                if len(element_type) > 0:
+                    elem_data += line.replace("\r", "")
+    result = XElement()
+    result.element_type = element_type
+    result.data = elem_data
+    result.children = children
+    result.end_line_num = end_index
+    result.name = element_name
+    return result
+
+class XFileParser:
+    # frame_names: 読み込むフレームの名前(Noneの場合はすべて) / Names of the frames to load (all if None)
+    # materials_only: マテリアルのみを読み込む / Load only materials
+    # progress: 進捗を書き込み、中止を確認するXParseProgress(Noneの場合は確認しない) / XParseProgress to write progress to and check for cancellation (not checked if None)
+    def __init__(self, filepath, stream_decompression=False, frame_names=None, materials_only=False, progress=None):
+        self.filepath = filepath
+        self.stream_decompression = stream_decompression
+        self.frame_names = frame_names
+        self.materials_only = materials_only
+        self.progress = progress
+        self.is_binary = False
+        self.is_compressed = False
+        self.float_size = 32
+        self.ret_string = ""
+        self.ret_integer = 0
+        self.ret_float = 0
+        self.ret_integer_list = []
+        self.ret_float_list = []
+        self.ret_uuid = ""
+        self.byte_buffer = utility.ByteBuffer(bytes())
+        self.text_content = ""
+        self.text_pos = 0
+        self.text_brace_count = 0
+        self.bin_brace_count = 0
+        # 名前付きのデータオブジェクト / Named data objects
+        self.named_meshes: dict[str, XModelMesh] = {}
+        self.named_materials: dict[str, XMaterial] = {}
+        # フレームから参照されたメッシュ / Meshes referenced from frames
+        self.referenced_meshes: set[XModelMesh] = set()
+        # 解析したすべてのマテリアル(出現順) / All parsed materials (in order of appearance)
+        self.parsed_materials: list[XMaterial] = []
+        # 参照した位置でまだ定義されていなかった(リスト, インデックス, テンプレート名, 名前) /
+        #  (List, index, template name, name) of references that were not yet defined where they were referenced
+        self.unresolved_references: list[tuple[list, int, str, str]] = []
+        self.warnings: list[tuple[str, str]] = []
+        # バイナリファイルの索引 / Index of the binary file
+        self.index: list[XIndexEntry] = []
+        # (テンプレート名, オブジェクト名)から最初に定義された索引を引く辞書 / Dictionary to look up the first defined index entry from (template name, object name)
+        self.named_entries: dict[tuple[str, str], XIndexEntry] = {}
+        # 索引の位置から解析済みのデータオブジェクトを引く辞書 / Dictionary to look up the parsed data object from the position of the index entry
+        self.parsed_objects = {}
+
+    def parse(self) -> XModelNode:
+        self.start_phase("Read")
+        # xファイルを読み込み / Load x file
+        with open(self.filepath, "rb") as f:
+            header = f.read(16)
+            if header[0:4] == b'xof ':
+                # フォーマットのチェック
+                self.is_compressed = False
+                if header[8:12] == b'txt ':
+                    self.is_binary = False
+                elif header[8:12] == b'bin ':
+                    self.is_binary = True
+                elif header[8:12] == b'bzip':
+                    self.is_binary = True
+                    self.is_compressed = True
+                self.float_size = int(header[12:16].decode())
+            else:
+                raise XFileFormatError("This file is not X file!")
+
+        if self.is_binary:
+            # バイナリ / Binary
+
+            # flate圧縮 / Flate compression
+            if self.is_compressed:
+                with open(self.filepath, "rb") as f:
+                    f.read(16)
+                    raw_data = self.read_file(f, b"")
+                # 選択して読み込む場合は索引で位置を移動するため、先に全体を展開する / When loading selectively, decompress everything first because the index moves the position
+                if self.stream_decompression and self.frame_names is None and not self.materials_only:
+                    # 展開しながら解析する / Parse while decompressing
+                    self.start_phase("Parse")
+                    cancel_event = self.progress.cancel_event if self.progress is not None else None
+                    self.byte_buffer = utility.StreamingByteBuffer(raw_data, cancel_event=cancel_event)
+                    try:
+                        root_node = self.parse_bin()
+                    finally:
+                        self.byte_buffer.release()
+                else:
+                    self.start_phase("Decompress")
+                    on_progress = self.set_phase_fraction if self.progress is not None else None
+                    self.byte_buffer = utility.ByteBuffer(utility.decompress_mszip(raw_data, on_progress=on_progress), copy=False)
+                    del raw_data
+                    self.start_phase("Parse")
+                    root_node = self.parse_bin()
+            else:
+                # ファイルをメモリマップしてコピーせずに読み取る / Memory-map the file and read it without copying
+                with open(self.filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                    self.start_phase("Parse")
+                    self.byte_buffer = utility.ByteBuffer(mapped_file, copy=False)
+                    self.byte_buffer.skip(16)
+                    try:
+                        root_node = self.parse_bin()
+                    finally:
+                        self.byte_buffer.release()
+        else:
+            # テキスト / Text
+            with open(self.filepath) as f:
+                x_model_file_string = self.read_file(f, "")
+                self.text_content = x_model_file_string
+                self.start_phase("Parse")
+
+                root_node = XModelNode()
+
+                token = self.get_next_token_text()
+                while token != None:
+                    if self.text_brace_count == 0:
+                        if token == "template":
+                            self.get_next_token_text()
+                        elif token == "Mesh":
+                            root_node.meshes.append(self.parse_mesh_text())
+                        elif token == "Material":
+                            self.parse_material_text()
+                        elif token == "Frame":
+                            self.parse_frame_text(root_node)
+                    token = self.get_next_token_text()
+                self.resolve_references()
+
+                # テキストは索引を作らないため、解析した結果から選択する / Text files have no index, so select from the parsed result
+                if self.materials_only:
+                    root_node = XModelNode()
+                    root_node.materials = self.parsed_materials
+                elif self.frame_names is not None:
+                    root_node = select_frames(root_node, self.frame_names)
+
+        # フレームから参照されたメッシュは定義した位置には作らない / Meshes referenced from frames are not created where they are defined
+        root_node.meshes = [mesh for mesh in root_node.meshes if mesh not in self.referenced_meshes]
+        root_node.warnings = self.warnings
+        self.start_phase("")
+        return root_node
+
+    def start_phase(self, phase):
+        if self.progress is not None:
+            self.progress.start_phase(phase)
+
+    # 現在の段階の進み具合を更新する(中止されていればCancelledErrorを送出する) / Update the progress of the current phase (raise CancelledError if cancelled)
+    def set_phase_fraction(self, fraction):
+        self.progress.check_cancelled()
+        self.progress.fraction = fraction
+
+    # ファイルの残りを読み込む(進捗を記録する場合は少しずつ読む) / Read the rest of the file (little by little when recording progress)
+    # empty: 読み込んだ部分をつなぐ空の文字列かbytes / Empty str or bytes to join the read parts
+    def read_file(self, f, empty):
+        if self.progress is None:
+            return f.read()
+        size = max(os.fstat(f.fileno()).st_size, 1)
+        chunks = []
+        read_size = 0
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            # テキストは文字数なので目安 / For text this is the number of characters, so it is approximate
+            read_size += len(chunk)
+            self.set_phase_fraction(min(read_size / size, 1.0))
+        return empty.join(chunks)
+
+    # 中止されていればCancelledErrorを送出し、解析の進捗を更新する / Raise CancelledError if cancelled, and update the parse progress
+    def check_progress(self):
+        if self.progress is None:
+            return
+        if self.is_binary:
+            self.set_phase_fraction(self.byte_buffer.get_progress())
+        elif len(self.text_content) > 0:
+            self.set_phase_fraction(self.text_pos / len(self.text_content))
+
+    # 名前付きのデータオブジェクトを登録する / Register a named data object
+    def register_mesh(self, name, mesh: XModelMesh):
+        if name:
+            self.named_meshes[name] = mesh
+
+    def register_material(self, name, material: XMaterial):
+        if name:
+            self.named_materials[name] = material
+
+    # 参照されたメッシュを取得する(見つからない場合はNone) / Get the referenced mesh (None if not found)
+    def get_referenced_mesh(self, name):
+        mesh = self.named_meshes.get(name)
+        if mesh is None:
+            # 後で定義されている、または読み飛ばしたメッシュは索引から解析する / Parse meshes defined later or skipped from the index
+            entry = self.named_entries.get(("Mesh", name))
+            if entry is not None:
+                mesh = self.parse_indexed_object_bin(entry, self.parse_mesh_bin)
+        if mesh is not None:
+            self.referenced_meshes.add(mesh)
+        return mesh
+
+    # 参照されたマテリアルを取得する(見つからない場合はNone) / Get the referenced material (None if not found)
+    def get_referenced_material(self, name):
+        material = self.named_materials.get(name)
+        if material is None:
+            entry = self.named_entries.get(("Material", name))
+            if entry is not None:
+                material = self.parse_indexed_object_bin(entry, self.parse_material_bin)
+        return material
+
+    # 参照されたデータオブジェクトをリストに追加する / Add a referenced data object to a list
+    # 索引のないテキストや展開しながら読むファイルでは後で定義されるものが見つからないため、解析の最後に解決する /
+    #  Text files and files read while decompressing have no index and cannot find objects defined later, so they are resolved at the end of parsing
+    def add_reference(self, items, template_name, name):
+        if name is None:
+            return
+        item = self.get_referenced_mesh(name) if template_name == "Mesh" else self.get_referenced_material(name)
+        if item is None:
+            self.unresolved_references.append((items, len(items), template_name, name))
+        items.append(item)
+
+    # 後で定義された参照を解決し、見つからない参照は警告して取り除く / Resolve references defined later, and remove references not found with a warning
+    def resolve_references(self):
+        unresolved_lists = {}
+        for items, index, template_name, name in self.unresolved_references:
+            item = self.get_referenced_mesh(name) if template_name == "Mesh" else self.get_referenced_material(name)
+            if item is None:
+                self.warnings.append(("Referenced mesh not found" if template_name == "Mesh" else "Referenced material not found", name))
+                unresolved_lists[id(items)] = items
+            items[index] = item
+        for items in unresolved_lists.values():
+            items[:] = [item for item in items if item is not None]
+        self.unresolved_references.clear()
+
+    def parse_mesh_text(self) -> XModelMesh:
+        self.check_progress()
+        mesh = XModelMesh()
+        object_name = self.get_object_name_text()
+        self.register_mesh(object_name, mesh)
+        vertex_size = self.get_next_int_text()
+        mesh.positions.extend(self.get_next_floats_text(vertex_size * 3))
+        self.check_progress()
+        faces_size = self.get_next_int_text()
+        mesh.add_faces(self.get_next_faces_text(faces_size))
+        self.check_progress()
+        
+        brace_count = self.text_brace_count
+        
+        token = self.get_next_token_text()
+        while token != None and self.text_brace_count >= brace_count:
+            if brace_count == self.text_brace_count:
+                if token == "MeshMaterialList":
+                    self.parse_mesh_material_list_text(mesh)
+                elif token == "MeshTextureCoords":
+                    self.parse_mesh_texture_coords_text(mesh)
+            token = self.get_next_token_text()
+        return mesh
+
+    def parse_mesh_texture_coords_text(self, mesh: XModelMesh):
+        object_name = self.get_object_name_text()
+        vertex_size = self.get_next_int_text()
+        mesh.tex_coords.extend(self.get_next_floats_text(vertex_size * 2))
+
+    def parse_mesh_material_list_text(self, mesh: XModelMesh):
+        object_name = self.get_object_name_text()
+        mesh.material_count = self.get_next_int_text()
+        face_count = self.get_next_int_text()
+        mesh.material_face_indexes.extend(self.get_next_ints_text(face_count))
+        
+        brace_count = self.text_brace_count
+        previous = ";"
+        token = self.get_next_token_text()
+        while token != None and self.text_brace_count >= brace_count:
+            if brace_count == self.text_brace_count:
+                if token == "Material":
+                    mesh.materials.append(self.parse_material_text())
+                    token = "}"
+            elif token == "{" and brace_count + 1 == self.text_brace_count and previous in TEXT_REFERENCE_PRECEDING_TOKENS:
+                # 名前で参照されたマテリアル / Material referenced by name
+                self.add_reference(mesh.materials, "Material", self.get_reference_text())
+                token = "}"
+            previous = token
+            token = self.get_next_token_text()
+
+    def parse_material_text(self) -> XMaterial:
+        self.check_progress()
+        object_name = self.get_object_name_text()
+        color = (self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text())
+        power = self.get_next_float_text()
+        specular_color = (self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text())
+        self.skip_next_token_text(";")
+        emissive_color = (self.get_next_float_text(), self.get_next_float_text(), self.get_next_float_text())
+        material = XMaterial()
+        material.face_color = color
+        material.power = power
+        material.specular_color = specular_color
+        material.emission_color = emissive_color
+        material.name = object_name
+        self.register_material(object_name, material)
+        self.parsed_materials.append(material)
+
+        brace_count = self.text_brace_count
+        token = self.get_next_token_text()
+        while token != None and self.text_brace_count >= brace_count:
+            if brace_count == self.text_brace_count:
+                if token == "TextureFilename":
+                    material.texture_path = self.get_next_string_text()
+                    self.skip_next_token_text(";")
+            token = self.get_next_token_text()
+        return material
+    
+    def parse_frame_text(self, node: XModelNode):
+        self.check_progress()
+        child = XModelNode()
+        child.node_name = self.get_object_name_text()
+
+        brace_count = self.text_brace_count
+        previous = "{"
+        token = self.get_next_token_text()
+        while token != None and self.text_brace_count >= brace_count:
+            if brace_count == self.text_brace_count:
+                if token == "FrameTransformMatrix":
+                    self.skip_until_text("{")
+                    values = self.get_next_floats_text(16)
+                    child.transform_matrix = (tuple(values[0:4]), tuple(values[4:8]), tuple(values[8:12]), tuple(values[12:16]))
+                    self.skip_until_text("}")
+                    token = "}"
+                elif token == "Mesh":
+                    child.meshes.append(self.parse_mesh_text())
+                    token = "}"
+                elif token == "Frame":
+                    self.parse_frame_text(child)
+                    token = "}"
+            elif token == "{" and brace_count + 1 == self.text_brace_count and previous in TEXT_REFERENCE_PRECEDING_TOKENS:
+                # 名前で参照されたメッシュ(同じメッシュを複数のフレームで使う) / Mesh referenced by name (the same mesh used by multiple frames)
+                self.add_reference(child.meshes, "Mesh", self.get_reference_text())
+                token = "}"
+            previous = token
+            token = self.get_next_token_text()
+        node.children.append(child)
+    
+    def get_next_token_text(self):
+        match = TEXT_TOKEN_PATTERN.match(self.text_content, self.text_pos)
+        if match is None:
+            self.text_pos = len(self.text_content)
+            return None
+        self.text_pos = match.end()
+        token = match.group(1)
+        if token == "{":
+            self.text_brace_count += 1
+        elif token == "}":
+            self.text_brace_count -= 1
+        return token
+
+    def skip_until_text(self, target):
+        token = ""
+        while True:
+            token = self.get_next_token_text()
+            if token == target:
+                break
+    
+    def skip_next_token_text(self, expected):
+        token = self.get_next_token_text()
+        if token != expected:
+            raise Exception(f"Unexpected token: {token}")
+        
+    def get_next_number_text(self):
+        token = self.get_next_token_text()
+        while token == ";" or token == ",":
+            token = self.get_next_token_text()
+        
+        if token == None:
+            raise Exception("Unexpected end of file")
+        
+        return token
+
+    def get_next_int_text(self):
+        return int(self.get_next_number_text())
+        
+    def get_next_float_text(self):
+        return float(self.get_next_number_text())
+
+    def get_next_numbers_text(self, count):
+        # 区切り文字を含むcount個の数値の範囲を一度に読み取る / Read the span of count numbers including separators at once
+        match = text_number_block_pattern(count).match(self.text_content, self.text_pos)
+        numbers = self.split_numbers_text(match.group()) if match is not None else None
+        if numbers is None:
+            return [self.get_next_number_text() for _ in range(count)]
+        self.text_pos = match.end()
+        return numbers
+
+    def split_numbers_text(self, block):
+        if "#" in block or "//" in block:
+            block = TEXT_COMMENT_PATTERN.sub("", block)
+        if not block.isascii():
+            return None
+        return block.replace(";", " ").replace(",", " ").split()
+
+    def get_next_floats_text(self, count):
+        return list(map(float, self.get_next_numbers_text(count)))
+
+    def get_next_ints_text(self, count):
+        return list(map(int, self.get_next_numbers_text(count)))
+
+    def get_next_faces_text(self, count):
+        # 面データは長さが可変なので、続く整数をまとめて読み取ってから面に分ける /
+        #  Face data has variable length, so read the following integers at once and then split them into faces
+        # 戻り値は頂点数が前に付いた面データ(n, i0, ..., in-1, n, ...) / The return value is face data prefixed with vertex counts (n, i0, ..., in-1, n, ...)
+        block = TEXT_INTEGER_RUN_PATTERN.match(self.text_content, self.text_pos).group()
+        numbers = self.split_numbers_text(block)
+        if numbers is None:
+            numbers = []
+        values = list(map(int, numbers))
+        i = 0
+        for _ in range(count):
+            if i >= len(values):
+                i = len(values) + 1
+                break
+            i += values[i] + 1
+        if i > len(values):
+            # まとめて読めない場合は1つずつ読む / Read one by one if they cannot be read at once
+            values = []
+            for _ in range(count):
+                length = self.get_next_int_text()
+                values.append(length)
+                values.extend(self.get_next_ints_text(length))
+            return values
+        # 使用した数値の分だけ読み進める / Advance by the numbers used
+        self.get_next_numbers_text(i)
+        del values[i:]
+        return values
+
+    def get_next_string_text(self):
+        self.skip_until_text('"')
+        match = TEXT_STRING_PATTERN.match(self.text_content, self.text_pos)
+        self.text_pos = match.end()
+        # エスケープされた文字は読み飛ばす / Skip escaped characters
+        ret = TEXT_ESCAPE_PATTERN.sub("", match.group(1))
+        if len(ret) == 0:
+            return None
+        return ret
+
+    # "{"の後の参照({ Name }または{ Name <GUID> })を読み取る(参照でない場合はNone) /
+    #  Read a reference ({ Name } or { Name <GUID> }) after "{" (None if it is not a reference)
+    def get_reference_text(self):
+        name = self.get_next_token_text()
+        if name is None or name in TEXT_REFERENCE_PRECEDING_TOKENS:
+            return None
+        token = self.get_next_token_text()
+        if token is not None and token.startswith("<"):
+            token = self.get_next_token_text()
+        if token != "}":
+            return None
+        return name
+
+    def get_object_name_text(self):
+        token = self.get_next_token_text()
+        if token == "{":
+            return None
+        self.skip_next_token_text("{")
+        return token
+
+    def parse_token(self):
+        token = self.byte_buffer.get_short()
+        if token == TOKEN_NAME:
+            length = self.byte_buffer.get_int()
+            self.ret_string = self.byte_buffer.get_str(length)
+        elif token == TOKEN_INTEGER:
+            self.ret_integer = self.byte_buffer.get_int()
+        elif token == TOKEN_STRING:
+            length = self.byte_buffer.get_int()
+            self.ret_string = self.byte_buffer.get_str(length)
+            self.parse_token()
+        elif token == TOKEN_GUID:
+            # GUIDは使用しないため無視する / Ignore GUID as it is not used
+            self.byte_buffer.get_int()
+            self.byte_buffer.get_short()
+            self.byte_buffer.get_short()
+            self.byte_buffer.get_length(8)
+        elif token == TOKEN_INTEGER_LIST:
+            length = self.byte_buffer.get_int()
+            self.ret_integer_list = self.byte_buffer.get_int_array(length)
+        elif token == TOKEN_FLOAT_LIST:
+            length = self.byte_buffer.get_int()
+            if self.float_size == 64:
+                self.ret_float_list = self.byte_buffer.get_double_array(length)
+            else:
+                self.ret_float_list = self.byte_buffer.get_float_array(length)
+        elif token == TOKEN_TEMPLATE:
+            # テンプレートは使用する必要がないため無視する / Ignore templates as they are not needed
+            self.parse_token_loop(TOKEN_CBRACE)
+        elif token == TOKEN_OBRACE:
+            self.bin_brace_count += 1
+        elif token == TOKEN_CBRACE:
+            self.bin_brace_count -= 1
+        return token
+
+    def parse_token_loop(self, token):
+        while self.parse_token() != token:
+            pass
+
+    def parse_bin(self) -> XModelNode:
+        root_node = XModelNode()
+        if isinstance(self.byte_buffer, utility.StreamingByteBuffer):
+            # 展開しながら解析する場合は先に索引を作れないため、先頭から順に読む / When parsing while decompressing, the index cannot be built first, so read from the beginning in order
+            while self.byte_buffer.has_remaining():
+                token = self.parse_token()
+                if token == TOKEN_NAME:
+                    if self.ret_string == "Mesh":
+                        root_node.meshes.append(self.parse_mesh_bin())
+                    elif self.ret_string == "Material":
+                        self.parse_material_bin()
+                    elif self.ret_string == "Frame":
+                        self.parse_frame_bin(root_node)
+        else:
+            # 索引を作り、必要なデータオブジェクトだけを解析する / Build the index and parse only the required data objects
+            self.index = self.build_index_bin()
+            if self.materials_only:
+                for entry in iterate_index(self.index):
+                    if entry.template_name == "Material":
+                        root_node.materials.append(self.parse_indexed_object_bin(entry, self.parse_material_bin))
+            elif self.frame_names is not None:
+                self.parse_selected_frames_bin(self.index, root_node)
+            else:
+                for entry in self.index:
+                    if entry.template_name == "Mesh":
+                        root_node.meshes.append(self.parse_indexed_object_bin(entry, self.parse_mesh_bin))
+                    elif entry.template_name == "Material":
+                        self.parse_indexed_object_bin(entry, self.parse_material_bin)
+                    elif entry.template_name == "Frame":
+                        self.parse_indexed_bin(entry, self.parse_frame_bin, root_node)
+        self.resolve_references()
+        # フレームから参照されたメッシュは定義した位置には作らない / Meshes referenced from frames are not created where they are defined
+        root_node.meshes = [mesh for mesh in root_node.meshes if mesh not in self.referenced_meshes]
+        return root_node
+
+    # データオブジェクトの位置と括弧の範囲の索引を作る(リストの中身は読まずに飛ばす) /
+    #  Build an index of the positions and brace ranges of data objects (the contents of lists are skipped without reading)
+    def build_index_bin(self) -> list[XIndexEntry]:
+        byte_buffer = self.byte_buffer
+        start_pos = byte_buffer.pos
+        float_bytes = 8 if self.float_size == 64 else 4
+        index = []
+        # 開いている括弧のデータオブジェクト(参照などデータオブジェクトでない括弧はNone) / Data objects of open braces (None for braces that are not data objects, such as references)
+        stack: list[XIndexEntry | None] = []
+        # "{"の前に続いた名前のトークンの(位置, 名前) / (Position, name) of the name tokens before "{"
+        names = []
+        is_template = False
+        while byte_buffer.has_remaining():
+            pos = byte_buffer.pos
+            token = byte_buffer.get_short()
+            if token == TOKEN_NAME:
+                names.append((pos, byte_buffer.get_str(byte_buffer.get_int())))
+                continue
+            elif token == TOKEN_GUID:
+                byte_buffer.skip(16)
+                continue
+            elif token == TOKEN_OBRACE:
+                entry = None
+                if not is_template and len(names) != 0:
+                    # "テンプレート名 {" または "テンプレート名 オブジェクト名 {" / "TemplateName {" or "TemplateName ObjectName {"
+                    template_pos, template_name = names[-2] if len(names) >= 2 else names[-1]
+                    object_name = names[-1][1] if len(names) >= 2 else ""
+                    entry = XIndexEntry(template_name, object_name, template_pos, len(stack))
+                    parent = next((e for e in reversed(stack) if e is not None), None)
+                    (parent.children if parent is not None else index).append(entry)
+                    if entry.object_name:
+                        self.named_entries.setdefault((entry.template_name, entry.object_name), entry)
+                is_template = False
+                stack.append(entry)
+            elif token == TOKEN_CBRACE:
+                if len(stack) != 0:
+                    entry = stack.pop()
+                    if entry is not None:
+                        entry.end = byte_buffer.pos
+            elif token == TOKEN_STRING:
+                byte_buffer.skip(byte_buffer.get_int())
+            elif token == TOKEN_INTEGER:
+                byte_buffer.skip(4)
+            elif token == TOKEN_INTEGER_LIST:
+                byte_buffer.skip(byte_buffer.get_int() * 4)
+            elif token == TOKEN_FLOAT_LIST:
+                byte_buffer.skip(byte_buffer.get_int() * float_bytes)
+            elif token == TOKEN_TEMPLATE:
+                # テンプレートの括弧はデータオブジェクトではない / The braces of templates are not data objects
+                is_template = True
+            names.clear()
+        byte_buffer.pos = start_pos
+        return index
+
+    # 索引のデータオブジェクトの位置に移動して解析し、元の位置に戻る / Move to the position of an indexed data object, parse it and return to the original position
+    def parse_indexed_bin(self, entry: XIndexEntry, parse_function, *args):
+        byte_buffer = self.byte_buffer
+        pos, mark_pos, brace_count = byte_buffer.pos, byte_buffer.mark_pos, self.bin_brace_count
+        byte_buffer.pos = entry.start
+        self.bin_brace_count = entry.depth
+        # テンプレート名を読み飛ばす / Skip the template name
+        self.parse_token()
+        result = parse_function(*args)
+        byte_buffer.pos, byte_buffer.mark_pos, self.bin_brace_count = pos, mark_pos, brace_count
+        return result
+
+    # 同じデータオブジェクトは1度だけ解析する / Parse the same data object only once
+    def parse_indexed_object_bin(self, entry: XIndexEntry, parse_function):
+        result = self.parsed_objects.get(entry.start)
+        if result is None:
+            result = self.parse_indexed_bin(entry, parse_function)
+            self.parsed_objects[entry.start] = result
+        return result
+
+    # "{"の後の参照({ Name }または{ Name GUID })を読み取る(参照でない場合はNone) /
+    #  Read a reference ({ Name } or { Name GUID }) after "{" (None if it is not a reference)
+    def get_reference_bin(self):
+        token = self.parse_token()
+        if token != TOKEN_NAME:
+            return None
+        name = self.ret_string
+        token = self.parse_token()
+        if token == TOKEN_GUID:
+            token = self.parse_token()
+        if token != TOKEN_CBRACE:
+            return None
+        return name
+
+    def parse_mesh_bin(self) -> XModelMesh:
+        self.check_progress()
+        mesh = XModelMesh()
+        token = self.parse_token()
+        if token == TOKEN_NAME:
+            self.register_mesh(self.ret_string, mesh)
+        if token != TOKEN_INTEGER_LIST:
+            self.parse_token_loop(TOKEN_INTEGER_LIST)
+        self.parse_token_loop(TOKEN_FLOAT_LIST)
+        # 頂点座標はファイルの精度のまま保持する / Keep vertex coordinates in the precision of the file
+        mesh.positions = self.ret_float_list[0:self.ret_integer_list[0] * 3]
+        self.parse_token_loop(TOKEN_INTEGER_LIST)
+        mesh.face_indices = array.array(utility.INT32_TYPECODE)
+        mesh.face_offsets = array.array(utility.INT32_TYPECODE, [0])
+        mesh.add_faces(self.ret_integer_list[1:])
+        
+        brace_count = self.bin_brace_count
+        token = self.parse_token()
+        while brace_count <= self.bin_brace_count:
+            if brace_count == self.bin_brace_count and token == TOKEN_NAME:
+                if self.ret_string == "MeshTextureCoords":
+                    self.parse_mesh_texture_coords_bin(mesh)
+                elif self.ret_string == "MeshMaterialList":
+                    self.parse_mesh_material_list_bin(mesh)
+            token = self.parse_token()
+        return mesh
+
+    def parse_mesh_texture_coords_bin(self, mesh: XModelMesh):
+        self.parse_token_loop(TOKEN_INTEGER_LIST)
+        self.parse_token_loop(TOKEN_FLOAT_LIST)
+        uv_values = self.ret_float_list
+        mesh.tex_coords.extend(uv_values[0:len(uv_values) // 2 * 2].tolist())
+
+    def parse_mesh_material_list_bin(self, mesh: XModelMesh):
+        self.parse_token_loop(TOKEN_INTEGER_LIST)
+        mesh.material_count = self.ret_integer_list[0]
+        mesh.material_face_indexes = self.ret_integer_list[2:self.ret_integer_list[1] + 2]
+        self.byte_buffer.mark()
+        brace_count = self.bin_brace_count
+        while True:
+            token = self.parse_token()
+            is_material = False
+            if token == TOKEN_NAME and self.ret_string == "Material":
+                mesh.materials.append(self.parse_material_bin())
+                is_material = True
+            elif token == TOKEN_OBRACE:
+                name = self.get_reference_bin()
+                if name is not None:
+                    # 名前で参照されたマテリアル / Material referenced by name
+                    self.add_reference(mesh.materials, "Material", name)
+                    is_material = True
+            if not is_material:
+                # 読みすぎたトークンを戻す / Push back the token that was read too far
+                self.byte_buffer.reset()
+                self.bin_brace_count = brace_count
+                break
+            self.byte_buffer.mark()
+            brace_count = self.bin_brace_count
+
+    def parse_material_bin(self) -> XMaterial:
+        self.check_progress()
+        token = self.parse_token()
+        material_name = ""
+        if token == TOKEN_NAME:
+            material_name = self.ret_string
+        self.parse_token_loop(TOKEN_FLOAT_LIST)
+        material = XMaterial()
+        material.name = material_name
+        self.register_material(material_name, material)
+        self.parsed_materials.append(material)
+        material.face_color = (self.ret_float_list[0], self.ret_float_list[1], self.ret_float_list[2], self.ret_float_list[3])
+        material.power = self.ret_float_list[4]
+        material.specular_color = (self.ret_float_list[5], self.ret_float_list[6], self.ret_float_list[7])
+        material.emission_color = (self.ret_float_list[8], self.ret_float_list[9], self.ret_float_list[10])
+        token = self.parse_token()
+        if token == TOKEN_NAME and self.ret_string == "TextureFilename":
+            self.parse_token_loop(TOKEN_STRING)
+            material.texture_path = self.ret_string
+            self.parse_token_loop(TOKEN_CBRACE)
+        if token != TOKEN_CBRACE:
+            self.parse_token_loop(TOKEN_CBRACE)
+        return material
+    
+    def parse_frame_bin(self, node: XModelNode):
+        self.check_progress()
+        child = XModelNode()
+        token = self.parse_token()
+        name = ""
+        if token == TOKEN_NAME:
+            name = self.ret_string
+        child.node_name = name
+        # フレームの"{"まで読み進める / Read up to the "{" of the frame
+        while token != TOKEN_OBRACE:
+            token = self.parse_token()
+        brace_count = self.bin_brace_count
+        previous = token
+        token = self.parse_token()
+        while brace_count <= self.bin_brace_count:
+            if brace_count == self.bin_brace_count and token == TOKEN_NAME:
+                if self.ret_string == "FrameTransformMatrix":
+                    child.transform_matrix = self.parse_frame_transform_matrix_bin()
+                    token = TOKEN_CBRACE
+                elif self.ret_string == "Mesh":
+                    child.meshes.append(self.parse_mesh_bin())
+                    token = TOKEN_CBRACE
+                elif self.ret_string == "Frame":
+                    self.parse_frame_bin(child)
+                    token = TOKEN_CBRACE
+            elif token == TOKEN_OBRACE and brace_count + 1 == self.bin_brace_count and previous in BIN_REFERENCE_PRECEDING_TOKENS:
+                # 名前で参照されたメッシュ(同じメッシュを複数のフレームで使う) / Mesh referenced by name (the same mesh used by multiple frames)
+                self.add_reference(child.meshes, "Mesh", self.get_reference_bin())
+                token = TOKEN_CBRACE
+            previous = token
+            token = self.parse_token()
+        node.children.append(child)
+
+    def parse_frame_transform_matrix_bin(self):
+        self.parse_token_loop(TOKEN_FLOAT_LIST)
+        values = self.ret_float_list.tolist()
+        self.parse_token_loop(TOKEN_CBRACE)
+        return (tuple(values[0:4]), tuple(values[4:8]), tuple(values[8:12]), tuple(values[12:16]))
+
+    # 索引のフレームのうち、指定した名前のフレームだけを解析する(途中のフレームは変換行列だけを読む) /
+    #  Parse only the indexed frames with the given names (only the transform matrix is read from frames on the way)
+    def parse_selected_frames_bin(self, entries: list[XIndexEntry], node: XModelNode):
+        for entry in entries:
+            if entry.template_name != "Frame":
+                continue
+            if entry.object_name in self.frame_names:
+                self.parse_indexed_bin(entry, self.parse_frame_bin, node)
+                continue
+            child = XModelNode()
+            child.node_name = entry.object_name
+            for child_entry in entry.children:
+                if child_entry.template_name == "FrameTransformMatrix":
+                    child.transform_matrix = self.parse_indexed_bin(child_entry, self.parse_frame_transform_matrix_bin)
+            self.parse_selected_frames_bin(entry.children, child)
+            if len(child.children) != 0:
+                node.children.append(child)
+
+# Xファイルを解析してルートノードを返す / Parse an X file and return the root node
+# frame_namesを指定した場合はそのフレームだけを、materials_onlyの場合はマテリアルだけを読み込む /
+#  If frame_names is given, only those frames are loaded, and if materials_only, only materials are loaded
+def parse_x_file(filepath, stream_decompression=False, frame_names=None, materials_only=False, progress=None) -> XModelNode:
+    return XFileParser(filepath, stream_decompression, frame_names, materials_only, progress).parse()
+
+# ワーカープロセス用に、解析にかかった時間も返す / For worker processes, also return the time taken to parse
+# cacheを指定した場合はParseCache経由で読み込む / If cache is given, load through the ParseCache
+def parse_x_file_timed(filepath, stream_decompression=False, cache=None) -> tuple[XModelNode, float]:
+    start = time.perf_counter()
+    if cache is not None:
+        root_node = cache.parse(filepath, stream_decompression)
+    else:
+        root_node = parse_x_file(filepath, stream_decompression)
+    return root_node, time.perf_counter() - start
+
+# ワーカープロセスで親パッケージの__init__(bpyを読み込む)を実行せずにこのモジュールを読み込めるようにする /
+#  Let worker processes import this module without running the __init__ of the parent packages (which imports bpy)
+WORKER_BOOTSTRAP_SOURCE = """
+import sys
+import types
+for name, path in packages:
+    if name not in sys.modules:
+        module = types.ModuleType(name)
+        module.__path__ = path
+        sys.modules[name] = module
+"""
+
+# Xファイルを解析するプロセスプールを作成する / Create a process pool for parsing X files
+def create_process_pool(max_workers=None) -> ProcessPoolExecutor:
+    packages = []
+    parts = __package__.split(".")
+    for i in range(len(parts)):
+        name = ".".join(parts[:i + 1])
+        packages.append((name, list(sys.modules[name].__path__)))
+    # Blenderのプロセスをforkしないようにspawnを使う / Use spawn so as not to fork the Blender process
+    return ProcessPoolExecutor(
+        max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=exec,
+        initargs=(WORKER_BOOTSTRAP_SOURCE, {"packages": packages}),
+    )
@@ -0,0 +1,99 @@
+import bpy
+from bpy.app.handlers import persistent
+
+# エクスポート用に処理したオブジェクトごとの形状のメモリ上のキャッシュ / In-memory cache of the geometry processed for export per object
+
+class ExportCache:
+    # max_size: キャッシュの合計サイズの上限(バイト) / Upper limit of the total cache size (bytes)
+    def __init__(self, max_size):
+        self.max_size = max_size
+        # オブジェクトのキーから(確認用の値, 形状, 関係するオブジェクトのsession_uid)を引く辞書(最近使ったものが後ろ) /
+        #  Dictionary to look up (values for validation, geometry, session_uids of related objects) from the key of an object (recently used ones at the end)
+        self.entries = {}
+        # 関係するオブジェクトのsession_uidからキーを引く辞書 / Dictionary to look up keys from the session_uid of a related object
+        self.keys_by_owner: dict[int, set] = {}
+        self.size = 0
+
+    # 確認用の値が一致する場合のみ形状を返す(ない場合はNone) / Return the geometry only if the values for validation match (None if it does not exist)
+    def get(self, key, validation):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        # 最近使ったものとして記録する / Record as recently used
+        self.entries[key] = entry
+        if entry[0] != validation:
+            self.discard(key)
+            return None
+        return entry[1]
+
+    # owner_ids: 変更されたらこの形状を削除するオブジェクトのsession_uid / session_uids of the objects whose changes delete this geometry
+    def put(self, key, validation, geometry, owner_ids):
+        self.discard(key)
+        self.entries[key] = (validation, geometry, owner_ids)
+        for owner_id in owner_ids:
+            self.keys_by_owner.setdefault(owner_id, set()).add(key)
+        self.size += geometry.get_size()
+        self.evict()
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1].get_size()
+            for owner_id in entry[2]:
+                keys = self.keys_by_owner.get(owner_id)
+                if keys is not None:
+                    keys.discard(key)
+                    if len(keys) == 0:
+                        del self.keys_by_owner[owner_id]
+
+    # オブジェクトに関係する形状をすべて削除する / Delete all geometry related to an object
+    def discard_owner(self, owner_id):
+        for key in list(self.keys_by_owner.get(owner_id, ())):
+            self.discard(key)
+
+    # 合計サイズが上限を超えたら最も長く使われていないものから削除する / When the total size exceeds the limit, delete the least recently used entries first
+    def evict(self):
+        while self.size > self.max_size and len(self.entries) > 0:
+            self.discard(next(iter(self.entries)))
+
+    def clear(self):
+        self.entries.clear()
+        self.keys_by_owner.clear()
+        self.size = 0
+
+export_cache = ExportCache(0)
+
+# 形状か変換が更新されたオブジェクトをキャッシュから削除する / Remove objects whose geometry or transform was updated from the cache
+@persistent
+def on_depsgraph_update_post(scene, depsgraph):
+    if len(export_cache.entries) == 0:
+        return
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Object) and (update.is_updated_geometry or update.is_updated_transform):
+            export_cache.discard_owner(update.id.original.session_uid)
+
+# ファイルを開いたときや元に戻したとき、フレームを変更したときはすべて削除する /
+#  Delete everything when a file is opened, an undo/redo is performed or the frame is changed
+# フレームの変更ではdepsgraph_update_postが呼ばれないため、アーマチュアやシェイプキー、ドライバーによる変形を検出できない /
+#  depsgraph_update_post is not called on frame changes, so deformation by armatures, shape keys or drivers cannot be detected
+@persistent
+def on_reset(*args):
+    export_cache.clear()
+
+HANDLERS = (
+    (bpy.app.handlers.depsgraph_update_post, on_depsgraph_update_post),
+    (bpy.app.handlers.load_post, on_reset),
+    (bpy.app.handlers.undo_post, on_reset),
+    (bpy.app.handlers.redo_post, on_reset),
+    (bpy.app.handlers.frame_change_post, on_reset),
+)
+
+def register():
+    for handlers, handler in HANDLERS:
+        handlers.append(handler)
+
+def unregister():
+    for handlers, handler in HANDLERS:
+        if handler in handlers:
+            handlers.remove(handler)
+    export_cache.clear()
@@ -2,6 +2,7 @@ import bpy
 from bpy.props import StringProperty, BoolProperty, FloatProperty, FloatVectorProperty
 from bpy_extras.io_utils import ExportHelper
 from .model_data_utility import ModelDataUtility
+from .preferences import get_export_cache
 from .utility import float_to_str, vertex_to_str
 
 # CSVファイルに出力 / Export to CSV file
@@ -40,6 +41,30 @@ class ExportCSVFile(bpy.types.Operator, ExportHelper):
         default=True,
     )
 
+    weld_position_tolerance: FloatProperty(
+        name="Position weld tolerance",
+        description="Vertex positions are rounded to multiples of this value when merging vertices (0: merge only identical positions)",
+        default=0.0,
+        min=0.0,
+        precision=6,
+    )
+
+    weld_normal_tolerance: FloatProperty(
+        name="Normal weld tolerance",
+        description="Normals are rounded to multiples of this value when merging normals (0: merge only identical normals)",
+        default=0.0,
+        min=0.0,
+        precision=6,
+    )
+
+    weld_uv_tolerance: FloatProperty(
+        name="UV weld tolerance",
+        description="UVs are rounded to multiples of this value when merging vertices",
+        default=0.0001,
+        min=0.0,
+        precision=6,
+    )
+
     decal_transparent_color: FloatVectorProperty(
         name="Decal transparent color",
         size=4,
@@ -55,7 +80,9 @@ class ExportCSVFile(bpy.types.Operator, ExportHelper):
             return {'CANCELLED'}
 
         model_data_utility = ModelDataUtility()
-        model_data_utility.execute(context, export_selected_only=self.export_selected_only, scale=self.scale, gamma_correction=self.gamma_correction)
+        model_data_utility.execute(context, export_selected_only=self.export_selected_only, scale=self.scale, gamma_correction=self.gamma_correction,
+                                   position_tolerance=self.weld_position_tolerance, normal_tolerance=self.weld_normal_tolerance, uv_tolerance=self.weld_uv_tolerance,
+                                   cache=get_export_cache(context))
         vertexes = model_data_utility.vertexes
         faces = model_data_utility.faces
         x_materials = model_data_utility.x_materials
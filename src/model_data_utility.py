@@ -1,10 +1,69 @@
 import re
 import bpy
 import math
+import mathutils
+import numpy
 
 from .types import CustomOpenBveCsvNode
+from .export_cache import ExportCache
 
-from .utility import vertex_to_str
+# 溶接の許容値の下限(以前の文字列のキーの精度) / Lower limit of the weld tolerance (precision of the former string keys)
+MIN_WELD_TOLERANCE = 1.0e-10
+
+# 許容値の格子に丸めた整数のキー / Integer keys rounded to a grid of the tolerance
+def quantize(values, tolerance: float):
+    return numpy.rint(values.astype(numpy.float64) / max(tolerance, MIN_WELD_TOLERANCE)).astype(numpy.int64)
+
+# 行ごとのキーを重複なく最初に現れた順に並べる / Arrange the per-row keys without duplicates in order of first appearance
+# 重複のないキー、それが最初に現れた行の位置、行ごとのキーの番号を返す / Returns the unique keys, the rows where they first appear and the number of the key of each row
+def unique_rows(keys):
+    unique_keys, first_rows, inverse = numpy.unique(keys, axis=0, return_index=True, return_inverse=True)
+    order = numpy.argsort(first_rows, kind='stable')
+    ranks = numpy.empty(len(order), dtype=numpy.int32)
+    ranks[order] = numpy.arange(len(order), dtype=numpy.int32)
+    return unique_keys[order], first_rows[order], ranks[inverse.reshape(-1)]
+
+# キーに出力全体で出現順の番号を付ける / Number the keys in order of appearance across the whole output
+# 番号と、新しいキーの位置を返す / Returns the numbers and the positions of the new keys
+def merge_indexes(keys, index_dict: dict[tuple, int]):
+    indexes = numpy.empty(len(keys), dtype=numpy.int64)
+    new_rows = []
+    for row, key in enumerate(map(tuple, keys.tolist())):
+        index = index_dict.get(key)
+        if index is None:
+            index = len(index_dict)
+            index_dict[key] = index
+            new_rows.append(row)
+        indexes[row] = index
+    return indexes, new_rows
+
+# mathutilsの行列とベクトルの積と同じ計算(float32の積をdoubleで足してfloat32に戻す)、4x4の行列ではw=1とする /
+#  Same calculation as the product of a mathutils matrix and vector (float32 products are summed in double and converted back to float32), with w=1 for 4x4 matrices
+# matrices: 行列ごとに(ベクトルの数, 3)の結果を返す / Returns a (number of vectors, 3) result for each matrix
+def multiply_matrix_vectors(matrices, vectors):
+    vectors = numpy.broadcast_to(vectors, (len(matrices),) + vectors.shape[-2:])
+    result = numpy.empty(vectors.shape, dtype=numpy.float32)
+    for row in range(3):
+        dot = numpy.zeros(vectors.shape[:2])
+        for column in range(3):
+            dot += matrices[:, row, column, numpy.newaxis] * vectors[:, :, column]
+        if matrices.shape[2] == 4:
+            dot += matrices[:, row, 3, numpy.newaxis]
+        result[:, :, row] = dot
+    return result
+
+# mathutilsのVector.normalize()と同じ計算 / Same calculation as Vector.normalize() of mathutils
+def normalize_vectors(vectors):
+    length_squared = numpy.zeros(len(vectors))
+    for column in (2, 1, 0):
+        length_squared += vectors[:, column] * vectors[:, column]
+    # 長さの2乗はfloat32に戻してから比較する / The squared length is converted back to float32 before comparing
+    length_squared = length_squared.astype(numpy.float32)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        factor = numpy.float32(1.0) / numpy.sqrt(length_squared)
+        result = vectors * factor[:, numpy.newaxis]
+    result[length_squared <= numpy.float32(1.0e-35)] = 0.0
+    return result
 
 class OpenBveCsvProperty:
     enable_cross_fading: bool = False
@@ -59,6 +118,265 @@ def gen_fake_material():
     principled.inputs['Emission Color'].default_value = (0.0, 0.0, 0.0, 1.0)
     return material
 
+# マテリアルを解析してエクスポート用のMaterialにする(名前は除く) / Analyse a material into a Material for export (except the name)
+def analyze_material(material, gamma_correction: bool) -> Material:
+    x_material = Material()
+    if material.use_nodes:
+        texture = ""
+
+        # ノードを取得
+        nodes = material.node_tree.nodes
+        # プリンシプルBSDFを取得
+        principled = next(n for n in nodes if n.bl_idname == 'ShaderNodeBsdfPrincipled')
+
+        # ベースカラー
+        if len(principled.inputs['Base Color'].links) > 0:
+            need_color = True
+            for link in principled.inputs['Base Color'].links:
+                if link.from_node.bl_idname == "ShaderNodeTexImage":
+                    texture = bpy.path.basename(link.from_node.image.filepath)
+                    x_material.texture_extension = link.from_node.extension
+                    x_material.texture_name = link.from_node.image.name
+                if link.from_node.bl_idname == "ShaderNodeRGB":
+                    need_color = False
+                    for out in link.from_node.outputs:
+                        if out.bl_idname == 'NodeSocketColor':
+                            x_material.face_color = (out.default_value[0], out.default_value[1], out.default_value[2], principled.inputs['Alpha'].default_value)
+                            if gamma_correction:
+                                x_material.face_color = (
+                                    math.pow(x_material.face_color[0], 1/2.2),
+                                    math.pow(x_material.face_color[1], 1/2.2),
+                                    math.pow(x_material.face_color[2], 1/2.2),
+                                    x_material.face_color[3]
+                                )
+                if link.from_node.bl_idname == "ShaderNodeGamma":
+                    for input in link.from_node.inputs:
+                        if input.identifier == 'Gamma':
+                            if round(input.default_value * 100) != 220:
+                                raise Exception(bpy.app.translations.pgettext("Gamma correction is not 2.2"))
+                        if input.identifier == 'Color':
+                            need_color = False
+                            x_material.face_color = (input.default_value[0], input.default_value[1], input.default_value[2], principled.inputs['Alpha'].default_value)
+            if need_color:
+                x_material.face_color = (1.0, 1.0, 1.0, 1.0)
+        else:
+            col = principled.inputs['Base Color'].default_value
+            x_material.face_color = (col[0], col[1], col[2], principled.inputs['Alpha'].default_value)
+            if gamma_correction:
+                x_material.face_color = (
+                    math.pow(x_material.face_color[0], 1/2.2),
+                    math.pow(x_material.face_color[1], 1/2.2),
+                    math.pow(x_material.face_color[2], 1/2.2),
+                    x_material.face_color[3]
+                )
+        # 鏡面反射
+        x_material.power = principled.inputs['Specular IOR Level'].default_value
+        x_material.specular_color = principled.inputs['Specular Tint'].default_value
+
+        # 放射色
+        x_material.emission_color = principled.inputs['Emission Color'].default_value
+        x_material.emissive_power = principled.inputs['Emission Strength'].default_value
+
+        if texture != "":
+            x_material.texture_path = texture
+
+        # OpenBveCsvNodeを取得
+        for n in nodes:
+            if n.bl_idname == CustomOpenBveCsvNode.bl_idname:
+                openbve_csv_node: CustomOpenBveCsvNode = n
+                if openbve_csv_node is not None:
+                    x_material.openbve_csv_property = OpenBveCsvProperty()
+                    x_material.openbve_csv_property.use_add_face_2 = openbve_csv_node.use_add_face_2
+                    x_material.openbve_csv_property.enable_cross_fading = openbve_csv_node.enable_cross_fading
+                    x_material.openbve_csv_property.use_blend_mode = openbve_csv_node.use_blend_mode
+                    x_material.openbve_csv_property.blend_mode = openbve_csv_node.blend_mode
+                    x_material.openbve_csv_property.glow_half_distance = openbve_csv_node.glow_half_distance
+                    x_material.openbve_csv_property.glow_attenuation_mode = openbve_csv_node.glow_attenuation_mode
+                    x_material.openbve_csv_property.use_decal_transparent_color = openbve_csv_node.use_decal_transparent_color
+                    x_material.openbve_csv_property.decal_transparent_color = \
+                        (
+                            openbve_csv_node.decal_transparent_color[0],
+                            openbve_csv_node.decal_transparent_color[1],
+                            openbve_csv_node.decal_transparent_color[2],
+                        )
+                    x_material.openbve_csv_property.nighttime_texture_path = openbve_csv_node.nighttime_texture_path
+
+    else:
+        # ベースカラー
+        x_material.face_color = material.diffuse_color
+        # 鏡面反射
+        x_material.power = material.specular_intensity
+        # 鏡面反射色
+        x_material.specular_color = material.specular_color
+        # 放射色
+        x_material.emission_color = (0.0, 0.0, 0.0, 1.0)
+        # 放射強度
+        x_material.emissive_power = 0.0
+
+    # 放射色の計算
+    x_material.emission_color_calculated = (
+        x_material.emission_color[0] * min(x_material.emissive_power, 1.0),
+        x_material.emission_color[1] * min(x_material.emissive_power, 1.0),
+        x_material.emission_color[2] * min(x_material.emissive_power, 1.0)
+    )
+    return x_material
+
+# エクスポート用に処理したオブジェクトの形状(オブジェクト内で重複をまとめたもの) / Geometry of an object processed for export (with duplicates merged within the object)
+class ObjectGeometry:
+    __slots__ = (
+        "material_names", "textured", "material_indexes", "loop_totals",
+        "vertex_keys", "vertex_positions", "vertex_uvs", "loop_vertexes",
+        "normal_keys", "normal_values", "loop_normals",
+    )
+
+    def __init__(self):
+        # 形状を作ったときのマテリアルの名前 / Names of the materials when the geometry was made
+        self.material_names: tuple[str | None, ...] = ()
+        self.textured = False
+        # 面ごと / Per face
+        self.material_indexes = None
+        self.loop_totals = None
+        # 重複のない頂点(位置とUV)ごと / Per unique vertex (position and UV)
+        self.vertex_keys = None
+        self.vertex_positions = None
+        self.vertex_uvs = None
+        # 面の頂点ごとの、重複のない頂点の番号 / Number of the unique vertex for each vertex of the faces
+        self.loop_vertexes = None
+        # 重複のない法線ごと / Per unique normal
+        self.normal_keys = None
+        self.normal_values = None
+        self.loop_normals = None
+
+    # オブジェクトごとに持つ配列のサイズ(同じメッシュで共有するmaterial_indexesとloop_totalsは数えない) /
+    #  Size of the arrays each object owns (material_indexes and loop_totals shared by the same mesh are not counted)
+    def get_size(self):
+        arrays = (
+            self.vertex_keys, self.vertex_positions, self.vertex_uvs, self.loop_vertexes,
+            self.normal_keys, self.normal_values, self.loop_normals,
+        )
+        return sum(array.nbytes for array in arrays if array is not None)
+
+# 同じメッシュを使うオブジェクトで共有するローカル座標のデータ / Data in local coordinates shared by objects using the same mesh
+class MeshData:
+    __slots__ = ("materials", "material_indexes", "loop_totals", "positions", "loop_vertexes", "loop_normals", "loop_uvs")
+
+    def __init__(self):
+        self.materials = []
+        # 面ごと / Per face
+        self.material_indexes = None
+        self.loop_totals = None
+        # 頂点ごと / Per vertex
+        self.positions = None
+        # 面の頂点ごと(面ごとに逆順) / Per vertex of the faces (reversed for each face)
+        self.loop_vertexes = None
+        self.loop_normals = None
+        self.loop_uvs = None
+
+# メッシュのデータをまとめて配列に読み込む(面のないメッシュはNone) / Read the mesh data into arrays at once (None for meshes without faces)
+def read_mesh_data(mesh) -> MeshData | None:
+    polygon_count = len(mesh.polygons)
+    if polygon_count == 0:
+        return None
+    mesh_data = MeshData()
+    mesh_data.materials = list(mesh.materials)
+
+    uv_vertexes = mesh.uv_layers.active.data
+    mesh_data.material_indexes = numpy.empty(polygon_count, dtype=numpy.int32)
+    mesh.polygons.foreach_get("material_index", mesh_data.material_indexes)
+    vertex_co = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float32)
+    mesh.vertices.foreach_get("co", vertex_co)
+    loop_vertex_indexes = numpy.empty(len(mesh.loops), dtype=numpy.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vertex_indexes)
+    loop_normals = numpy.empty(len(mesh.loops) * 3, dtype=numpy.float32)
+    mesh.corner_normals.foreach_get("vector", loop_normals)
+    uvs = numpy.empty(len(uv_vertexes) * 2, dtype=numpy.float32)
+    uv_vertexes.foreach_get("uv", uvs)
+    loop_starts = numpy.empty(polygon_count, dtype=numpy.int32)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    loop_totals = numpy.empty(polygon_count, dtype=numpy.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    mesh_data.loop_totals = loop_totals
+    mesh_data.positions = vertex_co.reshape(-1, 3)
+
+    # 面ごとに頂点を逆順にしたループの並び / Order of loops with the vertices of each face reversed
+    polygon_of_loop = numpy.repeat(numpy.arange(polygon_count), loop_totals)
+    offsets = numpy.cumsum(loop_totals) - loop_totals
+    reversed_positions = 2 * offsets[polygon_of_loop] + loop_totals[polygon_of_loop] - 1 - numpy.arange(len(polygon_of_loop))
+    ordered_loops = loop_starts[polygon_of_loop] + reversed_positions - offsets[polygon_of_loop]
+    mesh_data.loop_vertexes = loop_vertex_indexes[ordered_loops]
+    mesh_data.loop_normals = loop_normals.reshape(-1, 3)[ordered_loops]
+    mesh_data.loop_uvs = uvs.reshape(-1, 2)[reversed_positions]
+    return mesh_data
+
+# 一度に処理する面の頂点の数の目安(メモリの使用量を抑える) / Guide for the number of face vertices processed at once (limits memory usage)
+GEOMETRY_BATCH_LOOPS = 1 << 20
+
+# 同じメッシュを使うオブジェクトごとのエクスポート用の形状をまとめて作る / Make the geometry for export of each object using the same mesh at once
+def build_object_geometries(mesh_data: MeshData, matrices, textured: bool, scale: float,
+                            position_tolerance: float, normal_tolerance: float, uv_tolerance: float) -> list[ObjectGeometry]:
+    loop_count = len(mesh_data.loop_vertexes)
+    batch_size = max(1, GEOMETRY_BATCH_LOOPS // loop_count)
+    if len(matrices) > batch_size:
+        geometries = []
+        for start in range(0, len(matrices), batch_size):
+            geometries.extend(build_object_geometries(mesh_data, matrices[start:start + batch_size], textured, scale,
+                                                      position_tolerance, normal_tolerance, uv_tolerance))
+        return geometries
+    count = len(matrices)
+
+    # ワールド座標から変換し、スケールに合わせる / Convert from world coordinates and fit to the scale
+    world_matrices = numpy.array([numpy.array(matrix, dtype=numpy.float32) for matrix in matrices], dtype=numpy.float32)
+    world_co = multiply_matrix_vectors(world_matrices, mesh_data.positions)
+    world_co = (world_co.astype(numpy.float64) * scale).astype(numpy.float32)
+    # 法線を取得する / Get normals
+    normal_matrices = numpy.array([numpy.array(matrix.inverted().transposed().to_3x3(), dtype=numpy.float32) for matrix in matrices], dtype=numpy.float32)
+    world_normals = normalize_vectors(multiply_matrix_vectors(normal_matrices, mesh_data.loop_normals).reshape(-1, 3)).reshape(count, loop_count, 3)
+
+    # オブジェクトの番号を先頭に付けたキーで、オブジェクトごとに重複をまとめる / Merge duplicates per object with keys prefixed by the object number
+    object_numbers = numpy.broadcast_to(numpy.arange(count, dtype=numpy.int64)[:, numpy.newaxis, numpy.newaxis], (count, loop_count, 1))
+    # 頂点が他のデータと重複していたらそれを使用する / Use it if the vertex overlaps with other data
+    # 頂点とUVはセットなのでセットで重複を調べる / Vertices and UVs are sets, so check for duplicates in sets
+    position_keys = quantize(world_co, position_tolerance)[:, mesh_data.loop_vertexes]
+    # テクスチャのないメッシュのUVは、テクスチャのあるメッシュのUVとは別のキーにする / UVs of meshes without textures get keys separate from UVs of meshes with textures
+    if textured:
+        uv_keys = numpy.column_stack((numpy.ones(loop_count, dtype=numpy.int64), quantize(mesh_data.loop_uvs, uv_tolerance)))
+    else:
+        uv_keys = numpy.zeros((loop_count, 3), dtype=numpy.int64)
+    uv_keys = numpy.broadcast_to(uv_keys, (count, loop_count, 3))
+    vertex_keys, vertex_rows, loop_vertexes = unique_rows(numpy.concatenate((object_numbers, position_keys, uv_keys), axis=2).reshape(-1, 7))
+    normal_keys, normal_rows, loop_normals = unique_rows(numpy.concatenate((object_numbers, quantize(world_normals, normal_tolerance)), axis=2).reshape(-1, 4))
+    # 最初に現れた順に並べたため、キーはオブジェクトの順に並んでいる / Since they are in order of first appearance, the keys are in order of the objects
+    vertex_ends = numpy.cumsum(numpy.bincount(vertex_keys[:, 0], minlength=count)).tolist()
+    normal_ends = numpy.cumsum(numpy.bincount(normal_keys[:, 0], minlength=count)).tolist()
+
+    geometries = []
+    vertex_start = 0
+    normal_start = 0
+    for number in range(count):
+        geometry = ObjectGeometry()
+        geometry.material_names = tuple(None if material is None else material.name for material in mesh_data.materials)
+        geometry.textured = textured
+        geometry.material_indexes = mesh_data.material_indexes
+        geometry.loop_totals = mesh_data.loop_totals
+        loop_start = number * loop_count
+
+        vertex_end = vertex_ends[number]
+        first_loops = vertex_rows[vertex_start:vertex_end] - loop_start
+        geometry.vertex_keys = vertex_keys[vertex_start:vertex_end, 1:]
+        geometry.vertex_positions = world_co[number, mesh_data.loop_vertexes[first_loops]]
+        if textured:
+            geometry.vertex_uvs = mesh_data.loop_uvs[first_loops]
+        geometry.loop_vertexes = loop_vertexes[loop_start:loop_start + loop_count] - vertex_start
+        vertex_start = vertex_end
+
+        normal_end = normal_ends[number]
+        geometry.normal_keys = normal_keys[normal_start:normal_end, 1:]
+        geometry.normal_values = world_normals[number, normal_rows[normal_start:normal_end] - loop_start]
+        geometry.loop_normals = loop_normals[loop_start:loop_start + loop_count] - normal_start
+        normal_start = normal_end
+        geometries.append(geometry)
+    return geometries
+
 # 出力用にデータを整形
 class ModelDataUtility:
     def __init__(self):
@@ -70,7 +388,76 @@ class ModelDataUtility:
         self.faces_use_material = []
         self.uv_data = []
 
-    def execute(self, context, export_selected_only: bool, scale: float, gamma_correction: bool):
+    # マテリアルの番号を返す(初めて使うときに1度だけ解析する) / Return the number of a material (analysed only once, when it is first used)
+    def get_material_index(self, material, materials_dict: dict[str, int], material_name_set: set[str], gamma_correction: bool) -> int:
+        index = materials_dict.get(material.name)
+        if index is None:
+            x_material = analyze_material(material, gamma_correction)
+            # マテリアル名はアルファベット英数字、アンダーバー、ハイフン
+            x_material.name = re.sub(r'[^0-9A-Za-z_-]', '', material.name)
+            if x_material.name in material_name_set:
+                index = len(material_name_set)
+                while True:
+                    if x_material.name + str(index) not in material_name_set:
+                        break
+                    index += 1
+                x_material.name = x_material.name + str(index)
+            if re.match(r'^[0-9_]', x_material.name):
+                x_material.name = ""
+            if len(x_material.name) == 0:
+                # マテリアル名の重複を避ける
+                material_name_set.add(x_material.name)
+            index = len(self.x_materials)
+            materials_dict[material.name] = index
+            self.x_materials.append(x_material)
+        return index
+
+    # メッシュのマテリアルを登録し、テクスチャの名前を返す / Register the materials of a mesh and return the name of the texture
+    def get_texture(self, materials, fake_material, materials_dict: dict[str, int], material_name_set: set[str], gamma_correction: bool) -> str:
+        texture = ""
+        if len(materials) == 0:
+            self.get_material_index(fake_material, materials_dict, material_name_set, gamma_correction)
+        for material in materials:
+            if material is None:
+                # マテリアルを追加したが、新規ボタンを押していない状態のマテリアルの場合
+                continue
+            x_material = self.x_materials[self.get_material_index(material, materials_dict, material_name_set, gamma_correction)]
+            # テクスチャの有無を確認
+            if x_material.texture_path != "":
+                texture = x_material.texture_path
+        return texture
+
+    # オブジェクトの形状を出力全体のデータに加える / Add the geometry of an object to the data of the whole output
+    def add_geometry(self, geometry: ObjectGeometry, fake_material, materials_dict: dict[str, int], vertexes_dict: dict[tuple, int], normals_dict: dict[tuple, int]):
+        # 使われているスロットごとにマテリアルの番号を引く / Look up the material number for each used slot
+        if len(geometry.material_names) == 0:
+            self.faces_use_material.extend([materials_dict[fake_material.name]] * len(geometry.loop_totals))
+        else:
+            slots, slot_of_polygon = numpy.unique(geometry.material_indexes, return_inverse=True)
+            slot_material_indexes = numpy.array([materials_dict[geometry.material_names[slot]] for slot in slots.tolist()], dtype=numpy.int64)
+            self.faces_use_material.extend(slot_material_indexes[slot_of_polygon.reshape(-1)].tolist())
+
+        vertex_ids, new_rows = merge_indexes(geometry.vertex_keys, vertexes_dict)
+        self.vertexes.extend(map(tuple, geometry.vertex_positions[new_rows].tolist()))
+        if geometry.textured:
+            self.uv_data.extend(map(mathutils.Vector, geometry.vertex_uvs[new_rows].tolist()))
+        else:
+            self.uv_data.extend([(0.0, 0.0)] * len(new_rows))
+        normal_ids, new_rows = merge_indexes(geometry.normal_keys, normals_dict)
+        self.normals.extend(map(tuple, geometry.normal_values[new_rows].tolist()))
+
+        loop_vertex_ids = vertex_ids[geometry.loop_vertexes].tolist()
+        loop_normal_ids = normal_ids[geometry.loop_normals].tolist()
+        start = 0
+        for end in numpy.cumsum(geometry.loop_totals).tolist():
+            self.faces.append(loop_vertex_ids[start:end])
+            self.vertex_use_normal.append(loop_normal_ids[start:end])
+            start = end
+
+    # position_tolerance, normal_tolerance, uv_tolerance: 同じとみなす値の間隔(0: 同じ値のみ) / Spacing of values regarded as the same (0: only equal values)
+    # cache: 変更されていないオブジェクトの形状を再利用するキャッシュ / Cache to reuse the geometry of objects that have not changed
+    def execute(self, context, export_selected_only: bool, scale: float, gamma_correction: bool,
+                position_tolerance: float = 0.0, normal_tolerance: float = 0.0, uv_tolerance: float = 0.0001, cache: ExportCache | None = None):
         self.vertexes = []
         vertexes_dict = {}
         self.normals = []
@@ -78,7 +465,6 @@ class ModelDataUtility:
         self.vertex_use_normal = []
         self.faces = []
         materials_dict: dict[str, int] = {}
-        materials = []
         self.x_materials: list[Material] = []
         self.faces_use_material = []
         self.uv_data = []
@@ -86,207 +472,86 @@ class ModelDataUtility:
 
         material_name_set = set()
 
+        # モディファイヤーを適用した状態のオブジェクトを取得
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+
         target_objects = bpy.context.scene.objects
         if export_selected_only:
             target_objects = bpy.context.selected_objects
+        # インスタンスを作るオブジェクトのうちエクスポートするもの / Objects creating instances that are exported
+        target_ids = {obj.session_uid for obj in target_objects if not obj.hide_get()}
+
+        # エクスポートする(評価後のオブジェクト, ワールド行列, キャッシュのキー, 変更されたら形状を削除するオブジェクト) /
+        #  Objects to export (evaluated object, world matrix, cache key, objects whose changes delete the geometry)
+        export_objects = []
+        # オブジェクトはビューレイヤーにないもの(ビューポートで無効、除外したコレクション)もエクスポートする /
+        #  Objects are exported even if they are not in the view layer (disabled in viewports, in excluded collections)
         for obj in target_objects:
             if obj.type == 'MESH' and not obj.hide_get():
-                # モディファイヤーを適用した状態のオブジェクトを取得
-                depsgraph = bpy.context.evaluated_depsgraph_get()
                 obj_tmp = obj.evaluated_get(depsgraph)
+                export_objects.append((obj_tmp, obj_tmp.matrix_world.copy(), obj.session_uid, (obj.session_uid,)))
+        # コレクションのインスタンスなどは、作ったオブジェクトとインスタンスの番号で区別する /
+        #  Collection instances etc. are distinguished by the object creating them and the instance number
+        for instance in depsgraph.object_instances:
+            if not instance.is_instance or instance.object.type != 'MESH':
+                continue
+            owner_id = instance.parent.original.session_uid
+            if owner_id in target_ids:
+                obj_tmp = instance.object
+                export_objects.append((obj_tmp, instance.matrix_world.copy(), (owner_id, tuple(instance.persistent_id)), (owner_id, obj_tmp.original.session_uid)))
 
-                # Meshに変換
-                mesh = obj_tmp.to_mesh(preserve_all_data_layers=True, depsgraph=depsgraph)
-                
-                uv_vertexes = mesh.uv_layers.active.data
-                vertex_index = 0
-                # 法線取得用
-                loops = mesh.loops
-                for polygon in mesh.polygons:
-                    ver = []
-                    normal = []
-                    nor = polygon.normal
-                    vertex_index += len(polygon.vertices) - 1
-                    texture = ""
-                    if len(mesh.materials) == 0:
-                        if fake_material.name not in materials_dict.keys():
-                            materials_dict[fake_material.name] = len(materials_dict.keys())
-                            materials.append(fake_material)
-                        self.faces_use_material.append(materials_dict[fake_material.name])
-                    else:
-                        for material in mesh.materials:
-                            if material is None:
-                                # マテリアルを追加したが、新規ボタンを押していない状態のマテリアルの場合
-                                continue
-                            if material.name not in materials_dict.keys():
-                                materials_dict[material.name] = len(materials_dict.keys())
-                                materials.append(material)
-                            if material.use_nodes:
-                                # ノードを取得
-                                nodes = material.node_tree.nodes
-                                # プリンシプルBSDFを取得
-                                principled = next(n for n in nodes if n.bl_idname == 'ShaderNodeBsdfPrincipled')
-                                # テクスチャの有無を確認
-                                if len(principled.inputs['Base Color'].links) > 0:
-                                    for link in principled.inputs['Base Color'].links:
-                                        if link.from_node.bl_idname == "ShaderNodeTexImage":
-                                            texture = bpy.path.basename(link.from_node.image.filepath)
-                        self.faces_use_material.append(materials_dict[mesh.materials[polygon.material_index].name])
-
-                    for (vertex, loop_index) in zip(reversed(polygon.vertices), reversed(polygon.loop_indices)):
-                        # ワールド座標から変換
-                        vertex_co = obj.matrix_world @ mesh.vertices[vertex].co
-                        # 法線を取得する
-                        nor = loops[loop_index].normal
-                        mx_inv = obj.matrix_world.inverted()
-                        mx_norm = mx_inv.transposed().to_3x3()
-                        world_norm = mx_norm @ nor
-                        world_norm.normalize()
-                        # スケールに合わせる
-                        vertex_co[0] *= scale
-                        vertex_co[1] *= scale
-                        vertex_co[2] *= scale
-                        # 頂点が他のデータと重複していたらそれを使用する
-                        # 頂点とUVはセットなのでセットで重複を調べる
-                        uv = uv_vertexes[vertex_index].uv
-                        if texture == "":
-                            uv = (0.0, 0.0)
-                        key = vertex_to_str(vertex_co) + str(uv)
-                        if key not in vertexes_dict.keys():
-                            vertexes_dict[key] = len(vertexes_dict.keys())
-                            self.vertexes.append(vertex_co)
-                            self.uv_data.append(uv)
-                        if vertex_to_str(world_norm) not in normals_dict.keys():
-                            normals_dict[vertex_to_str(world_norm)] = len(normals_dict.keys())
-                            self.normals.append(world_norm)
-                        ver.append(vertexes_dict[key])
-                        normal.append(normals_dict[vertex_to_str(world_norm)])
-                        vertex_index -= 1
-                    vertex_index += len(polygon.vertices) + 1
-                    self.faces.append(ver)
-                    self.vertex_use_normal.append(normal)
+        # 評価後のメッシュとマテリアルごとのデータ / Data per evaluated mesh and materials
+        mesh_datas: dict[tuple, MeshData | None] = {}
+        # 同じメッシュを使うオブジェクトは形状をまとめて作る / Make the geometry at once for objects using the same mesh
+        pending_objects: dict[tuple, list] = {}
+        geometries: list[ObjectGeometry | None] = []
+        for obj_tmp, matrix_world, key, owner_ids in export_objects:
+            slot_materials = [slot.material for slot in obj_tmp.material_slots]
+            material_names = tuple(None if material is None else material.name for material in slot_materials)
 
-        for material in materials:
-            if material is None:
-                # マテリアルを追加したが、新規ボタンを押していない状態のマテリアルの場合
-                continue
-            # ノードを使用するかどうか
-            x_material = Material()
-            # マテリアル名はアルファベット英数字、アンダーバー、ハイフン
-            x_material.name = re.sub(r'[^0-9A-Za-z_-]', '', material.name)
-            if x_material.name in material_name_set:
-                index = len(material_name_set)
-                while True:
-                    if x_material.name + str(index) not in material_name_set:
-                        break
-                    index += 1
-                x_material.name = x_material.name + str(index)
-            if re.match(r'^[0-9_]', x_material.name):
-                x_material.name = ""
-            if len(x_material.name) == 0:
-                # マテリアル名の重複を避ける
-                material_name_set.add(x_material.name)
-            if material.use_nodes:
-                texture = ""
-
-                # ノードを取得
-                nodes = material.node_tree.nodes
-                # プリンシプルBSDFを取得
-                principled = next(n for n in nodes if n.bl_idname == 'ShaderNodeBsdfPrincipled')
-
-                # ベースカラー
-                if len(principled.inputs['Base Color'].links) > 0:
-                    need_color = True
-                    for link in principled.inputs['Base Color'].links:
-                        print(link.from_node.bl_idname)
-                        if link.from_node.bl_idname == "ShaderNodeTexImage":
-                            texture = bpy.path.basename(link.from_node.image.filepath)
-                            x_material.texture_extension = link.from_node.extension
-                            x_material.texture_name = link.from_node.image.name
-                        if link.from_node.bl_idname == "ShaderNodeRGB":
-                            need_color = False
-                            for out in link.from_node.outputs:
-                                if out.bl_idname == 'NodeSocketColor':
-                                    x_material.face_color = (out.default_value[0], out.default_value[1], out.default_value[2], principled.inputs['Alpha'].default_value)
-                                    if gamma_correction:
-                                        x_material.face_color = (
-                                            math.pow(x_material.face_color[0], 1/2.2),
-                                            math.pow(x_material.face_color[1], 1/2.2),
-                                            math.pow(x_material.face_color[2], 1/2.2),
-                                            x_material.face_color[3]
-                                        )
-                        if link.from_node.bl_idname == "ShaderNodeGamma":
-                            for input in link.from_node.inputs:
-                                if input.identifier == 'Gamma':
-                                    if round(input.default_value * 100) != 220:
-                                        raise Exception(bpy.app.translations.pgettext("Gamma correction is not 2.2"))
-                                if input.identifier == 'Color':
-                                    need_color = False
-                                    x_material.face_color = (input.default_value[0], input.default_value[1], input.default_value[2], principled.inputs['Alpha'].default_value)
-                    if need_color:
-                        x_material.face_color = (1.0, 1.0, 1.0, 1.0)
-                else:
-                    col = principled.inputs['Base Color'].default_value
-                    x_material.face_color = (col[0], col[1], col[2], principled.inputs['Alpha'].default_value)
-                    if gamma_correction:
-                        x_material.face_color = (
-                            math.pow(x_material.face_color[0], 1/2.2),
-                            math.pow(x_material.face_color[1], 1/2.2),
-                            math.pow(x_material.face_color[2], 1/2.2),
-                            x_material.face_color[3]
-                        )
-                # 鏡面反射
-                x_material.power = principled.inputs['Specular IOR Level'].default_value
-                x_material.specular_color = principled.inputs['Specular Tint'].default_value
-
-                # 放射色
-                x_material.emission_color = principled.inputs['Emission Color'].default_value
-                x_material.emissive_power = principled.inputs['Emission Strength'].default_value
-
-                if texture != "":
-                    x_material.texture_path = texture
-                    
-                # OpenBveCsvNodeを取得
-                for n in nodes:
-                    if n.bl_idname == CustomOpenBveCsvNode.bl_idname:
-                        openbve_csv_node: CustomOpenBveCsvNode = n
-                        if openbve_csv_node is not None:
-                            x_material.openbve_csv_property = OpenBveCsvProperty()
-                            x_material.openbve_csv_property.use_add_face_2 = openbve_csv_node.use_add_face_2
-                            x_material.openbve_csv_property.enable_cross_fading = openbve_csv_node.enable_cross_fading
-                            x_material.openbve_csv_property.use_blend_mode = openbve_csv_node.use_blend_mode
-                            x_material.openbve_csv_property.blend_mode = openbve_csv_node.blend_mode
-                            x_material.openbve_csv_property.glow_half_distance = openbve_csv_node.glow_half_distance
-                            x_material.openbve_csv_property.glow_attenuation_mode = openbve_csv_node.glow_attenuation_mode
-                            x_material.openbve_csv_property.use_decal_transparent_color = openbve_csv_node.use_decal_transparent_color
-                            x_material.openbve_csv_property.decal_transparent_color = \
-                                (
-                                    openbve_csv_node.decal_transparent_color[0],
-                                    openbve_csv_node.decal_transparent_color[1],
-                                    openbve_csv_node.decal_transparent_color[2],
-                                )
-                            x_material.openbve_csv_property.nighttime_texture_path = openbve_csv_node.nighttime_texture_path
-                         
-            else:
-                # ベースカラー
-                x_material.face_color = material.diffuse_color
-                # 鏡面反射
-                x_material.power = material.specular_intensity
-                # 鏡面反射色
-                x_material.specular_color = material.specular_color
-                # 放射色
-                x_material.emission_color = (0.0, 0.0, 0.0, 1.0)
-                # 放射強度
-                x_material.emissive_power = 0.0
-
-            # 放射色の計算
-            x_material.emission_color_calculated = (
-                x_material.emission_color[0] * min(x_material.emissive_power, 1.0),
-                x_material.emission_color[1] * min(x_material.emissive_power, 1.0),
-                x_material.emission_color[2] * min(x_material.emissive_power, 1.0)
+            # 変更されていないオブジェクトはキャッシュの形状を使う / Use the cached geometry for objects that have not changed
+            geometry = None
+            validation = (
+                tuple(value for row in matrix_world for value in row),
+                len(obj_tmp.data.vertices), len(obj_tmp.data.loops), len(obj_tmp.data.polygons),
+                material_names, scale, position_tolerance, normal_tolerance, uv_tolerance,
             )
-            self.x_materials.append(x_material)
-            
+            if cache is not None:
+                geometry = cache.get(key, validation)
+            if geometry is not None:
+                texture = self.get_texture(slot_materials, fake_material, materials_dict, material_name_set, gamma_correction)
+                if geometry.textured != (texture != ""):
+                    # テクスチャの有無が変わった場合はUVから作り直す / Rebuild from the UVs if the presence of a texture changed
+                    geometry = None
+            if geometry is None:
+                # 同じ評価後のメッシュとマテリアルを使うオブジェクトでは1度だけ読み込む / Read only once for objects using the same evaluated mesh and materials
+                mesh_key = (obj_tmp.data.as_pointer(), material_names)
+                if mesh_key not in mesh_datas:
+                    # Meshに変換
+                    mesh = obj_tmp.to_mesh(preserve_all_data_layers=True, depsgraph=depsgraph)
+                    mesh_datas[mesh_key] = read_mesh_data(mesh)
+                    obj_tmp.to_mesh_clear()
+                mesh_data = mesh_datas[mesh_key]
+                if mesh_data is None:
+                    continue
+                texture = self.get_texture(mesh_data.materials, fake_material, materials_dict, material_name_set, gamma_correction)
+                # 評価後のメッシュのマテリアルがスロットと同じ場合のみキャッシュする / Cache only if the materials of the evaluated mesh are the same as the slots
+                # ビューレイヤーにないオブジェクトは変更が通知されないためキャッシュしない / Objects not in the view layer are not cached because their changes are not notified
+                cacheable = cache is not None and obj_tmp.is_evaluated and tuple(None if material is None else material.name for material in mesh_data.materials) == material_names
+                pending_objects.setdefault((mesh_key, texture != ""), []).append((len(geometries), matrix_world, key, validation, owner_ids, cacheable))
+            geometries.append(geometry)
+
+        for (mesh_key, textured), objects in pending_objects.items():
+            built_geometries = build_object_geometries(mesh_datas[mesh_key], [matrix_world for _, matrix_world, _, _, _, _ in objects], textured, scale,
+                                                       position_tolerance, normal_tolerance, uv_tolerance)
+            for (index, _, key, validation, owner_ids, cacheable), geometry in zip(objects, built_geometries):
+                geometries[index] = geometry
+                if cacheable:
+                    cache.put(key, validation, geometry, owner_ids)
+
+        for geometry in geometries:
+            self.add_geometry(geometry, fake_material, materials_dict, vertexes_dict, normals_dict)
+
         # 生成した偽物のマテリアルを削除
         fake_material.user_clear()
         
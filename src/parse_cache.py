@@ -0,0 +1,165 @@
+import hashlib
+import os
+import pickle
+import struct
+import tempfile
+
+from . import direct_x_parser
+from .direct_x_parser import XModelNode
+
+# 解析済みモデルのディスクキャッシュ(bpyに依存しない) / Disk cache of parsed models (does not depend on bpy)
+
+CACHE_MAGIC = b"XPC\0"
+# XModelNodeなどの構造を変更したら上げる / Increase when the structure of XModelNode etc. changes
+CACHE_VERSION = 4
+CACHE_EXTENSION = ".xcache"
+# マジック、バージョン、ファイル内容のハッシュ / Magic, version and hash of the file content
+CACHE_HEADER = struct.Struct("<4sI32s")
+
+# キャッシュから読み込んでよいクラス / Classes that may be loaded from the cache
+CACHE_ALLOWED_CLASSES = {
+    ("array", "array"),
+    ("array", "_array_reconstructor"),
+    (direct_x_parser.__name__, "XModelNode"),
+    (direct_x_parser.__name__, "XModelMesh"),
+    (direct_x_parser.__name__, "XMaterial"),
+}
+
+class CacheUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if (module, name) not in CACHE_ALLOWED_CLASSES:
+            raise pickle.UnpicklingError(f"Unexpected class in cache: {module}.{name}")
+        return super().find_class(module, name)
+
+# ファイル内容のハッシュ / Hash of the file content
+def get_file_digest(filepath):
+    digest = hashlib.blake2b(digest_size=32)
+    with open(filepath, "rb") as f:
+        while True:
+            chunk = f.read(1 << 20)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.digest()
+
+# 選択して読み込む設定を表すキー(すべて読み込む場合は空) / Key representing the selective loading settings (empty when loading everything)
+def get_selection_key(frame_names=None, materials_only=False):
+    if materials_only:
+        return "materials"
+    if frame_names is not None:
+        return "frames\0" + "\0".join(sorted(frame_names))
+    return ""
+
+class ParseCache:
+    # directory: キャッシュを置くディレクトリ / Directory for the cache
+    # max_size: キャッシュの合計サイズの上限(バイト) / Upper limit of the total cache size (bytes)
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+
+    # パス、サイズ、更新日時、選択の設定から決まるキャッシュファイルのパス / Path of the cache file determined by the path, size, modification time and selection settings
+    def get_entry_path(self, filepath, selection=""):
+        stat = os.stat(filepath)
+        key = f"{os.path.abspath(filepath)}\0{stat.st_size}\0{stat.st_mtime_ns}\0{selection}"
+        name = hashlib.blake2b(key.encode("utf-8", "surrogatepass"), digest_size=20).hexdigest()
+        return os.path.join(self.directory, name + CACHE_EXTENSION)
+
+    # キャッシュからルートノードを読み込む(ない場合はNone) / Load the root node from the cache (None if it does not exist)
+    def get(self, filepath, digest=None, selection="") -> XModelNode | None:
+        entry_path = self.get_entry_path(filepath, selection)
+        try:
+            with open(entry_path, "rb") as f:
+                magic, version, entry_digest = CACHE_HEADER.unpack(f.read(CACHE_HEADER.size))
+                if magic != CACHE_MAGIC or version != CACHE_VERSION:
+                    return None
+                # 更新日時が変わらずに書き換えられた場合に備えて内容も確認する / Also check the content in case it was rewritten without changing the modification time
+                if entry_digest != (digest if digest is not None else get_file_digest(filepath)):
+                    return None
+                root_node = CacheUnpickler(f).load()
+        except (OSError, struct.error, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+            return None
+        # 最近使ったものとして記録する / Record as recently used
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return root_node
+
+    # ルートノードをキャッシュに書き込む / Write the root node to the cache
+    def put(self, filepath, root_node: XModelNode, digest=None, selection=""):
+        os.makedirs(self.directory, exist_ok=True)
+        entry_path = self.get_entry_path(filepath, selection)
+        header = CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, digest if digest is not None else get_file_digest(filepath))
+        # 書き込み途中のファイルを読まないよう、一時ファイルに書いてから置き換える / Write to a temporary file and then replace, so that partially written files are never read
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                pickle.dump(root_node, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, entry_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    # キャッシュにあれば読み込み、なければ解析してキャッシュに書き込む / Load from the cache if present, otherwise parse and write to the cache
+    def parse(self, filepath, stream_decompression=False, frame_names=None, materials_only=False, progress=None) -> XModelNode:
+        if progress is not None:
+            progress.start_phase("Load cache")
+        digest = get_file_digest(filepath)
+        selection = get_selection_key(frame_names, materials_only)
+        root_node = self.get(filepath, digest, selection)
+        if root_node is None:
+            root_node = direct_x_parser.parse_x_file(filepath, stream_decompression, frame_names, materials_only, progress)
+            if progress is not None:
+                progress.start_phase("Write cache")
+            try:
+                self.put(filepath, root_node, digest, selection)
+            except OSError:
+                # キャッシュに書けなくてもインポートは続ける / Continue importing even if the cache cannot be written
+                pass
+        if progress is not None:
+            progress.start_phase("")
+        return root_node
+
+    def get_entries(self):
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(CACHE_EXTENSION):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        except OSError:
+            pass
+        return entries
+
+    # 合計サイズが上限を超えたら最も長く使われていないものから削除する / When the total size exceeds the limit, delete the least recently used entries first
+    def evict(self):
+        entries = self.get_entries()
+        total_size = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size -= size
+
+    def get_size(self):
+        return sum(size for _, size, _ in self.get_entries())
+
+    def clear(self):
+        for _, _, path in self.get_entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import bpy
+from bpy.props import BoolProperty, IntProperty
+
+from .parse_cache import ParseCache
+from .export_cache import ExportCache, export_cache
+
+def get_preferences(context):
+    addon = context.preferences.addons.get(__package__)
+    if addon is None:
+        return None
+    return addon.preferences
+
+# 解析キャッシュを置くディレクトリ / Directory for the parse cache
+def get_parse_cache_directory():
+    try:
+        return bpy.utils.extension_path_user(__package__, path="parse_cache")
+    except ValueError:
+        # 拡張機能としてインストールされていない場合 / When not installed as an extension
+        return os.path.join(tempfile.gettempdir(), "bve_import_export", "parse_cache")
+
+# 設定で有効な場合は解析キャッシュを返す / Return the parse cache if it is enabled in the preferences
+def get_parse_cache(context) -> ParseCache | None:
+    preferences = get_preferences(context)
+    if preferences is None or not preferences.use_parse_cache:
+        return None
+    return ParseCache(get_parse_cache_directory(), preferences.parse_cache_size * 1024 * 1024)
+
+# 設定で有効な場合はエクスポートのキャッシュを返す / Return the export cache if it is enabled in the preferences
+def get_export_cache(context) -> ExportCache | None:
+    preferences = get_preferences(context)
+    if preferences is None or not preferences.use_export_cache:
+        export_cache.clear()
+        return None
+    export_cache.max_size = preferences.export_cache_size * 1024 * 1024
+    return export_cache
+
+# 解析キャッシュを削除 / Clear the parse cache
+class ClearParseCache(bpy.types.Operator):
+    bl_idname = "preferences.bve_clear_parse_cache"
+    bl_description = 'Delete all cached parse results of X files'
+    bl_label = "Clear parse cache"
+
+    def execute(self, context):
+        cache = ParseCache(get_parse_cache_directory(), 0)
+        size = cache.get_size()
+        cache.clear()
+        self.report({'INFO'}, f"{bpy.app.translations.pgettext('Cleared parse cache')}: {size / (1024 * 1024):.1f} MB")
+        return {'FINISHED'}
+
+class BveImportExportPreferences(bpy.types.AddonPreferences):
+    bl_idname = __package__
+
+    use_parse_cache: BoolProperty(
+        name="Use parse cache",
+        description="Cache parsed X files on disk so that unchanged files are imported faster",
+        default=False,
+    )
+
+    parse_cache_size: IntProperty(
+        name="Parse cache size (MB)",
+        description="Least recently used entries are deleted when the cache grows beyond this size",
+        default=1024,
+        min=1,
+    )
+
+    use_export_cache: BoolProperty(
+        name="Use export cache",
+        description="Keep the processed geometry of each object in memory so that unchanged objects are exported faster",
+        default=False,
+    )
+
+    export_cache_size: IntProperty(
+        name="Export cache size (MB)",
+        description="Least recently used objects are removed when the export cache grows beyond this size",
+        default=256,
+        min=1,
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "use_parse_cache")
+        row = layout.row()
+        row.enabled = self.use_parse_cache
+        row.prop(self, "parse_cache_size")
+        layout.operator(ClearParseCache.bl_idname)
+        layout.prop(self, "use_export_cache")
+        row = layout.row()
+        row.enabled = self.use_export_cache
+        row.prop(self, "export_cache_size")
@@ -1,4 +1,22 @@
+import array
+import os
+import queue
 import struct
+import sys
+import threading
+import zlib
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+# 4バイト整数のarrayの型コード / Typecode of array for 4 byte integers
+INT32_TYPECODE = 'I' if array.array('I').itemsize == 4 else 'L'
+
+INT_STRUCT = struct.Struct("<I")
+SHORT_STRUCT = struct.Struct("<H")
+FLOAT_STRUCT = struct.Struct("<f")
+DOUBLE_STRUCT = struct.Struct("<d")
+
+MSZIP_BLOCK = 0x8000
+MSZIP_MAGIC = int.from_bytes("CK".encode(), byteorder='little')
 
 def vertex_to_str(vertex):
     # Blender X Z Y
@@ -30,11 +48,17 @@ def float_to_str(f):
     return float_string
 
 # Java風ByteBuffer / Java-like ByteBuffer
+# copy=Falseの場合はdata(bytes、mmapなど)をコピーせずに読み取り専用で参照する /
+#  If copy=False, data (bytes, mmap, etc.) is referenced read-only without copying
 class ByteBuffer:
 
-    def __init__(self, data):
-        self.array = bytearray(data)
+    def __init__(self, data, copy=True):
+        if copy:
+            self.array = bytearray(data)
+        else:
+            self.array = memoryview(data)
         self.pos = 0
+        self.mark_pos = None
 
     def get_next(self):
         value = self.array[self.pos]
@@ -47,16 +71,44 @@ class ByteBuffer:
         return value
 
     def get_int(self):
-        return int.from_bytes(self.get_length(4), byteorder='little')
+        value = INT_STRUCT.unpack_from(self.array, self.pos)[0]
+        self.pos += 4
+        return value
 
     def get_short(self):
-        return int.from_bytes(self.get_length(2), byteorder='little')
+        value = SHORT_STRUCT.unpack_from(self.array, self.pos)[0]
+        self.pos += 2
+        return value
 
     def get_float(self):
-        return struct.unpack("<f", self.get_length(4))[0]
+        value = FLOAT_STRUCT.unpack_from(self.array, self.pos)[0]
+        self.pos += 4
+        return value
 
     def get_double(self):
-        return struct.unpack("<d", self.get_length(8))[0]
+        value = DOUBLE_STRUCT.unpack_from(self.array, self.pos)[0]
+        self.pos += 8
+        return value
+
+    def get_str(self, length):
+        return str(self.get_length(length), 'utf-8')
+
+    # リトルエンディアンの配列をまとめて読み取る / Read a little endian array at once
+    def get_array(self, typecode, length):
+        values = array.array(typecode)
+        values.frombytes(self.get_length(length * values.itemsize))
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return values
+
+    def get_int_array(self, length):
+        return self.get_array(INT32_TYPECODE, length)
+
+    def get_float_array(self, length):
+        return self.get_array('f', length)
+
+    def get_double_array(self, length):
+        return self.get_array('d', length)
 
     def has_remaining(self):
         return len(self.array) > self.pos
@@ -69,9 +121,237 @@ class ByteBuffer:
     
     def skip(self, length):
         self.pos += length
+
+    # 現在の位置を記録する / Record the current position
+    def mark(self):
+        self.mark_pos = self.pos
+
+    # 記録した位置に戻り、記録を破棄する / Return to the recorded position and discard it
+    def reset(self):
+        self.pos = self.mark_pos
+        self.mark_pos = None
     
     def length(self):
         return len(self.array)
 
     def remaining(self):
         return len(self.array) - self.pos
+
+    # 読み取った位置の全体に対する割合 / Ratio of the read position to the whole
+    def get_progress(self):
+        return self.pos / len(self.array) if len(self.array) > 0 else 1.0
+
+    # 参照しているデータを解放する(mmapを閉じる前に必要) / Release the referenced data (required before closing mmap)
+    def release(self):
+        if isinstance(self.array, memoryview):
+            self.array.release()
+        self.array = bytearray()
+        self.pos = 0
+
+
+# MSZIPのブロック表を読み取る / Read the MSZIP block table
+# (圧縮データの位置, 圧縮データの長さ, 展開後の長さ)のリストを返す / Returns a list of (data position, compressed length, uncompressed length)
+def read_mszip_blocks(compressed_byte_buffer):
+    blocks = []
+    while compressed_byte_buffer.has_remaining():
+        uncompressed_size = compressed_byte_buffer.get_short()
+        block_size = compressed_byte_buffer.get_short()
+        magic = compressed_byte_buffer.get_short()
+        if block_size > MSZIP_BLOCK or block_size < 2 or uncompressed_size > MSZIP_BLOCK:
+            raise Exception("Unexpected compressed block size!")
+        if magic != MSZIP_MAGIC:
+            raise Exception("Unexpected compressed block magic!")
+        if compressed_byte_buffer.remaining() < block_size - 2:
+            raise Exception("Unexpected end of file")
+        blocks.append((compressed_byte_buffer.pos, block_size - 2, uncompressed_size))
+        compressed_byte_buffer.skip(block_size - 2)
+    return blocks
+
+
+# MSZIPのブロックを1つ展開する / Inflate one MSZIP block
+# 前のブロックを参照するブロックの場合、historyを辞書として使用する / For blocks referencing the previous block, history is used as the dictionary
+def inflate_mszip_block(compressed_data, uncompressed_size, history=None):
+    if history:
+        decompressor = zlib.decompressobj(-15, zdict=history)
+        data = decompressor.decompress(compressed_data, uncompressed_size)
+    else:
+        data = zlib.decompress(compressed_data, -15, MSZIP_BLOCK)
+    if len(data) != uncompressed_size:
+        raise Exception("Unexpected uncompressed block size!")
+    return data
+
+
+# bzip形式のXファイルのデータ(ヘッダーの後ろ)を展開する / Decompress the data of a bzip X file (after the header)
+# ブロックはスレッドプールで並列に展開し(zlibはGILを解放する)、確保済みのバッファに書き込む /
+#  Blocks are inflated in parallel in a thread pool (zlib releases the GIL) and written into a preallocated buffer
+# on_progress: ブロックを書き込むたびに展開した割合(0.0～1.0)を渡して呼ぶ関数(例外を送出すると展開を中止する) /
+#  Function called with the inflated ratio (0.0 to 1.0) after each block is written (raising an exception stops decompression)
+def decompress_mszip(data, max_workers=None, on_progress=None):
+    compressed_byte_buffer = ByteBuffer(data, copy=False)
+    # ヘッダー(16バイト)を含む展開後のサイズ / Uncompressed size including the header (16 bytes)
+    unzipped_size = compressed_byte_buffer.get_int()
+    blocks = read_mszip_blocks(compressed_byte_buffer)
+    total_size = sum(block[2] for block in blocks)
+    if total_size != unzipped_size - 16 and total_size != unzipped_size:
+        raise Exception("Unexpected uncompressed size!")
+    view = compressed_byte_buffer.array
+    output = bytearray(total_size)
+
+    def inflate(block):
+        pos, length, uncompressed_size = block
+        try:
+            return inflate_mszip_block(view[pos:pos + length], uncompressed_size)
+        except zlib.error:
+            # 前のブロックが必要なため、後で順番に展開する / Requires the previous block, so it is inflated later in order
+            return None
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers > 1 and len(blocks) > 1:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            results = executor.map(inflate, blocks)
+            write_mszip_blocks(view, blocks, results, output, on_progress)
+        finally:
+            # 中止された場合は残りのブロックを展開しない / When stopped, the remaining blocks are not inflated
+            executor.shutdown(cancel_futures=True)
+    else:
+        write_mszip_blocks(view, blocks, map(inflate, blocks), output, on_progress)
+    compressed_byte_buffer.release()
+    return output
+
+
+# 展開したブロックを順番に書き込む / Write the inflated blocks in order
+def write_mszip_blocks(view, blocks, results, output, on_progress=None):
+    output_pos = 0
+    for block, block_data in zip(blocks, results):
+        pos, length, uncompressed_size = block
+        if block_data is None:
+            history = bytes(output[max(output_pos - MSZIP_BLOCK, 0):output_pos])
+            block_data = inflate_mszip_block(view[pos:pos + length], uncompressed_size, history)
+        output[output_pos:output_pos + uncompressed_size] = block_data
+        output_pos += uncompressed_size
+        if on_progress is not None:
+            on_progress(output_pos / len(output))
+
+
+# 別スレッドでMSZIPのブロックを展開しながら読み取るByteBuffer / ByteBuffer that reads while inflating MSZIP blocks in another thread
+# 展開したブロックは最大max_blocks個までキューに保持し、読み終えたデータは破棄する /
+#  At most max_blocks inflated blocks are kept in the queue, and data that has been read is discarded
+# cancel_eventがセットされると展開を止め、読み取りはCancelledErrorを送出する /
+#  When cancel_event is set, decompression stops and reading raises CancelledError
+class StreamingByteBuffer(ByteBuffer):
+
+    def __init__(self, data, max_blocks=8, cancel_event=None):
+        super().__init__(bytes())
+        self.compressed_byte_buffer = ByteBuffer(data, copy=False)
+        # ヘッダー(16バイト)を含む展開後のサイズ / Uncompressed size including the header (16 bytes)
+        self.unzipped_size = self.compressed_byte_buffer.get_int()
+        self.blocks = read_mszip_blocks(self.compressed_byte_buffer)
+        total_size = sum(block[2] for block in self.blocks)
+        if total_size != self.unzipped_size - 16 and total_size != self.unzipped_size:
+            raise Exception("Unexpected uncompressed size!")
+        self.total_size = total_size
+        # 破棄した読み終えたデータのサイズ / Size of the discarded data that has been read
+        self.discarded_size = 0
+        self.block_queue = queue.Queue(maxsize=max_blocks)
+        self.finished = False
+        self.stopped = threading.Event()
+        self.cancel_event = cancel_event if cancel_event is not None else threading.Event()
+        self.producer = threading.Thread(target=self.produce, daemon=True)
+        self.producer.start()
+
+    def produce(self):
+        view = self.compressed_byte_buffer.array
+        history = None
+        try:
+            for pos, length, uncompressed_size in self.blocks:
+                if self.is_stopped():
+                    return
+                history = inflate_mszip_block(view[pos:pos + length], uncompressed_size, history)
+                self.put_block(history)
+            self.put_block(None)
+        except Exception as e:
+            self.put_block(e)
+
+    def is_stopped(self):
+        return self.stopped.is_set() or self.cancel_event.is_set()
+
+    def put_block(self, block):
+        while not self.is_stopped():
+            try:
+                self.block_queue.put(block, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    # 中止された場合は展開が止まるため、待ち続けずにCancelledErrorを送出する /
+    #  When cancelled, decompression stops, so raise CancelledError instead of waiting forever
+    def take_block(self):
+        while True:
+            try:
+                return self.block_queue.get(timeout=0.1)
+            except queue.Empty:
+                if self.cancel_event.is_set():
+                    raise CancelledError("Decompression was cancelled")
+
+    # length バイト読めるまでブロックを取得する / Take blocks until length bytes can be read
+    def fill(self, length):
+        while len(self.array) - self.pos < length and not self.finished:
+            block = self.take_block()
+            if block is None:
+                self.finished = True
+                break
+            if isinstance(block, Exception):
+                self.finished = True
+                raise block
+            # 読み終えたデータを破棄する(マークした位置以降は残す) / Discard data that has been read (keep data after the mark)
+            drop = self.pos if self.mark_pos is None else min(self.pos, self.mark_pos)
+            if drop > 0:
+                del self.array[:drop]
+                self.pos -= drop
+                self.discarded_size += drop
+                if self.mark_pos is not None:
+                    self.mark_pos -= drop
+            self.array.extend(block)
+
+    def get_next(self):
+        self.fill(1)
+        return super().get_next()
+
+    def get_length(self, length):
+        self.fill(length)
+        return super().get_length(length)
+
+    def get_int(self):
+        self.fill(4)
+        return super().get_int()
+
+    def get_short(self):
+        self.fill(2)
+        return super().get_short()
+
+    def get_float(self):
+        self.fill(4)
+        return super().get_float()
+
+    def get_double(self):
+        self.fill(8)
+        return super().get_double()
+
+    def has_remaining(self):
+        self.fill(1)
+        return super().has_remaining()
+
+    def skip(self, length):
+        self.fill(length)
+        super().skip(length)
+
+    def get_progress(self):
+        return (self.discarded_size + self.pos) / self.total_size if self.total_size > 0 else 1.0
+
+    def release(self):
+        self.stopped.set()
+        self.producer.join()
+        self.compressed_byte_buffer.release()
+        super().release()
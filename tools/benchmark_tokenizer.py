@@ -0,0 +1,145 @@
+# テキスト形式のトークナイザーの速度を以前の1文字ずつ読む実装と比較する(bpyがなくても実行できる) /
+#  Compare the speed of the text tokenizer with the previous implementation that read one character at a time (can be run without bpy)
+#
+# 使い方 / Usage: python tools/benchmark_tokenizer.py [file.x] [--vertices N]
+#  ファイルを指定しない場合はN頂点の合成メッシュを生成する / If no file is given, a synthetic mesh with N vertices is generated
+
+import argparse
+import importlib
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+
+# bpyを読み込む__init__.pyを実行せずにdirect_x_parserを読み込む / Load direct_x_parser without running __init__.py, which imports bpy
+def load_parser():
+    package = types.ModuleType("xfile_support_src")
+    package.__path__ = [os.path.normpath(SRC_DIR)]
+    sys.modules[package.__name__] = package
+    return importlib.import_module(package.__name__ + ".direct_x_parser")
+
+# 以前のget_next_token_text(比較用にそのまま残す) / The previous get_next_token_text (kept as is for comparison)
+class OldTokenizer:
+    def __init__(self, text_content):
+        self.text_content = text_content
+        self.text_pos = 0
+        self.text_brace_count = 0
+
+    def get_next_token_text(self):
+        start = False
+        ret = ""
+        while self.text_pos < len(self.text_content):
+            # comment
+            if len(self.text_content) + 1 < self.text_pos and self.text_content[self.text_pos] == '/' and self.text_content[len(self.text_content) + 1] == '/' or \
+                    self.text_content[self.text_pos] == '#':
+                while self.text_pos < len(self.text_content):
+                    if self.text_content[self.text_pos] == '\n' or self.text_content[self.text_pos] == '\r':
+                        break
+                    self.text_pos += 1
+            if self.is_ascii(self.text_content[self.text_pos]):
+                start = True
+                c = self.text_content[self.text_pos]
+                if c == "{" or c == "}" or c == "[" or c == "]" or  c == ";" or c == "," or c == '"':
+                    if len(ret) == 0:
+                        if c == "{":
+                            self.text_brace_count += 1
+                        elif c == "}":
+                            self.text_brace_count -= 1
+                        ret += c
+                        self.text_pos += 1
+                    return ret
+                ret += c
+            elif start:
+                break
+
+            self.text_pos += 1
+
+        if len(ret) == 0:
+            return None
+
+        return ret
+
+    def is_ascii(self, c):
+        return ord(c) <= 255 and ord(c) != ord(' ') and ord(c) != ord('\r') and ord(c) != ord('\n') and ord(c) != ord('\t')
+
+# 3頂点または4頂点の面とマテリアル、UVを持つメッシュのテキストを生成する / Generate the text of a mesh with triangles/quads, materials and UVs
+def generate_text(vertex_count, material_count=3, seed=1):
+    r = random.Random(seed)
+    face_count = vertex_count // 3
+    out = ["xof 0302txt 0064\n", "# synthetic mesh\n", "Mesh mesh_0 {\n %d;\n" % vertex_count]
+    out.append(",\n".join(" %f;%f;%f;" % (r.uniform(-50, 50), r.uniform(-5, 5), r.uniform(0, 100)) for _ in range(vertex_count)) + ";\n")
+    faces = []
+    for i in range(face_count):
+        if i % 2 == 0:
+            faces.append(" 4;%d,%d,%d,%d;" % (3 * i, 3 * i + 1, 3 * i + 2, (3 * i + 3) % vertex_count))
+        else:
+            faces.append(" 3;%d,%d,%d;" % (3 * i, 3 * i + 1, 3 * i + 2))
+    out.append(" %d;\n" % face_count + ",\n".join(faces) + ";\n")
+    out.append(" MeshMaterialList {\n  %d;\n  %d;\n" % (material_count, face_count))
+    out.append(",\n".join("  %d" % (i % material_count) for i in range(face_count)) + ";\n")
+    for i in range(material_count):
+        out.append("  Material Mat%d {\n   0.8;0.5;0.%d;1.0;;\n   5.0;\n   0.1;0.2;0.3;;\n   0.0;0.0;0.0;;\n" % (i, i))
+        if i == 0:
+            out.append('   TextureFilename {\n    "tex\\\\a.png";\n   }\n')
+        out.append("  }\n")
+    out.append(" }\n MeshTextureCoords {\n  %d;\n" % vertex_count)
+    out.append(",\n".join("  %f;%f;" % (r.random(), r.random()) for _ in range(vertex_count)) + ";\n }\n}\n")
+    return "".join(out)
+
+# すべてのトークンを読み取り、(トークンの列, 最後の括弧の深さ, 秒数)を返す / Read all tokens and return (token list, final brace depth, seconds)
+def tokenize(tokenizer):
+    tokens = []
+    get_next_token = tokenizer.get_next_token_text
+    start = time.perf_counter()
+    token = get_next_token()
+    while token is not None:
+        tokens.append(token)
+        token = get_next_token()
+    return tokens, tokenizer.text_brace_count, time.perf_counter() - start
+
+def main():
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument("file", nargs="?")
+    argument_parser.add_argument("--vertices", type=int, default=300000)
+    args = argument_parser.parse_args()
+    direct_x_parser = load_parser()
+
+    if args.file is not None:
+        path = args.file
+        with open(path, encoding="latin-1") as f:
+            text = f.read()
+    else:
+        text = generate_text(args.vertices)
+        with tempfile.NamedTemporaryFile("w", suffix=".x", delete=False) as f:
+            f.write(text)
+            path = f.name
+
+    try:
+        old_tokens, old_depth, old_seconds = tokenize(OldTokenizer(text))
+
+        parser = direct_x_parser.XFileParser(path)
+        parser.text_content = text
+        new_tokens, new_depth, new_seconds = tokenize(parser)
+
+        # テキストファイル全体の解析(数値のブロックは1トークンずつではなくまとめて読み取られる) /
+        #  Parsing the whole text file (numeric blocks are read at once instead of one token at a time)
+        start = time.perf_counter()
+        direct_x_parser.XFileParser(path).parse()
+        parse_seconds = time.perf_counter() - start
+    finally:
+        if args.file is None:
+            os.remove(path)
+
+    print("{:,} characters, {:,} tokens".format(len(text), len(old_tokens)))
+    print("token stream: {}".format("identical" if (old_tokens, old_depth) == (new_tokens, new_depth) else "DIFFERENT"))
+    print("old tokenizer, all tokens:    {:8.3f} s".format(old_seconds))
+    print("new tokenizer, all tokens:    {:8.3f} s ({:.1f}x)".format(new_seconds, old_seconds / new_seconds))
+    print("new parser, whole file:       {:8.3f} s ({:.1f}x)".format(parse_seconds, old_seconds / parse_seconds))
+    return 0 if (old_tokens, old_depth) == (new_tokens, new_depth) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
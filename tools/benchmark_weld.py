@@ -0,0 +1,177 @@
+# インポート時の頂点の結合(weld_mesh_positionsとextract_mesh_faces)の規模に対する速度を、以前のリストを線形探索する実装と比較する(bpyがなくても実行できる) /
+#  Compare how the vertex welding on import (weld_mesh_positions and extract_mesh_faces) scales against the previous implementation that scanned lists linearly (can be run without bpy)
+#
+# 使い方 / Usage: python tools/benchmark_weld.py [--sizes 1000,4000,...] [--old-limit N]
+# Blenderからアドオンを有効にして実行した場合は、同じメッシュのインポート全体の時間も計測する /
+#  When run from Blender with the add-on enabled, the time of the whole import of the same meshes is also measured:
+#  blender -b --python tools/benchmark_weld.py -- [options]
+
+import argparse
+import array
+import importlib
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+
+# bpyを読み込む__init__.pyを実行せずにdirect_x_parserを読み込む / Load direct_x_parser without running __init__.py, which imports bpy
+def load_parser():
+    package = types.ModuleType("xfile_support_src")
+    package.__path__ = [os.path.normpath(SRC_DIR)]
+    sys.modules[package.__name__] = package
+    return importlib.import_module(package.__name__ + ".direct_x_parser")
+
+# 頂点数nのXModelMesh(各座標が平均2回現れ、3頂点と4頂点の面を2つのマテリアルに分ける)を生成する /
+#  Generate an XModelMesh with n vertices (each position appears twice on average, triangles and quads split into 2 materials)
+def generate_mesh(direct_x_parser, vertex_count, seed=1):
+    r = random.Random(seed)
+    position_count = max(vertex_count // 2, 1)
+    points = [(r.uniform(-50, 50), r.uniform(-5, 5), r.uniform(0, 100)) for _ in range(position_count)]
+    mesh = direct_x_parser.XModelMesh()
+    for _ in range(vertex_count):
+        mesh.positions.extend(points[r.randrange(position_count)])
+    face_values = []
+    for i in range(vertex_count // 3):
+        if i % 2 == 0:
+            face_values += [4, 3 * i, 3 * i + 1, 3 * i + 2, (3 * i + 3) % vertex_count]
+        else:
+            face_values += [3, 3 * i, 3 * i + 1, 3 * i + 2]
+    mesh.add_faces(face_values)
+    mesh.material_count = 2
+    mesh.material_face_indexes.extend(i % 2 for i in range(mesh.get_face_count()))
+    return mesh
+
+# 以前の実装と書き出しのためにXModelMeshをリストに変換する / Convert an XModelMesh into lists for the previous implementation and for writing
+def mesh_to_lists(mesh):
+    positions = mesh.positions
+    vertices = [tuple(positions[i:i + 3]) for i in range(0, len(positions), 3)]
+    faces = [list(mesh.face_indices[mesh.face_offsets[i]:mesh.face_offsets[i + 1]]) for i in range(mesh.get_face_count())]
+    return vertices, faces, list(mesh.material_face_indexes)
+
+# 以前の実装(座標の結合とマテリアルごとの頂点の抽出をリストの線形探索で行う) /
+#  The previous implementation (welding positions and extracting vertices per material with linear list scans)
+def weld_old(vertices, faces, material_face_indexes, scale=1.0):
+    vertex_index = 0
+    mesh_vertexes = []
+    mesh_vertexes_redirect = {}
+    for vertex in vertices:
+        vector = (vertex[0] * scale, vertex[2] * scale, vertex[1] * scale)
+        if vector in mesh_vertexes:
+            mesh_vertexes_redirect[vertex_index] = mesh_vertexes.index(vector)
+        else:
+            mesh_vertexes_redirect[vertex_index] = len(mesh_vertexes)
+            mesh_vertexes.append(vector)
+        vertex_index += 1
+    mesh_faces = [[mesh_vertexes_redirect.get(k, k) for k in reversed(indexes)] for indexes in faces]
+    material_faces = [[], []]
+    for i, material_id in enumerate(material_face_indexes):
+        material_faces[material_id].append(i)
+
+    results = []
+    for faces_of_material in material_faces:
+        faces_data = []
+        vertexes_data = []
+        mesh_indexes = {}
+        for i in faces_of_material:
+            face = mesh_faces[i]
+            for k in face:
+                if mesh_vertexes[k] in vertexes_data:
+                    mesh_indexes[k] = vertexes_data.index(mesh_vertexes[k])
+                else:
+                    mesh_indexes[k] = len(vertexes_data)
+                    vertexes_data.append(mesh_vertexes[k])
+            faces_data.append([mesh_indexes[k] for k in face])
+        results.append((vertexes_data, faces_data))
+    return results
+
+# 現在の実装(XObjectCreator.create_mesh_dataが呼ぶ関数) / The current implementation (the functions called by XObjectCreator.create_mesh_data)
+def weld_new(direct_x_parser, mesh, scale=1.0):
+    mesh_vertexes, mesh_vertexes_redirect = direct_x_parser.weld_mesh_positions(mesh, scale)
+    material_faces = [[], []]
+    for i, material_id in enumerate(mesh.material_face_indexes):
+        material_faces[material_id].append(i)
+    return [direct_x_parser.extract_mesh_faces(mesh, mesh_vertexes, mesh_vertexes_redirect, faces) for faces in material_faces]
+
+# 以前の実装の結果を現在の実装と同じ平坦な配列に変換する / Convert the result of the previous implementation into the same flat arrays as the current one
+def flatten_old_result(results):
+    flat_results = []
+    for vertexes_data, faces_data in results:
+        vertex_positions = array.array('f', [value for vertex in vertexes_data for value in vertex])
+        loop_vertex_indices = array.array('i')
+        loop_starts = array.array('i')
+        for face in faces_data:
+            loop_starts.append(len(loop_vertex_indices))
+            loop_vertex_indices.extend(face)
+        flat_results.append((vertex_positions, loop_vertex_indices, loop_starts, array.array('f')))
+    return flat_results
+
+# Xファイル(テキスト)として書き出す / Write as an X file (text)
+def write_x_file(path, vertices, faces, material_face_indexes):
+    with open(path, "w") as f:
+        f.write("xof 0302txt 0064\nMesh mesh_0 {\n %d;\n" % len(vertices))
+        f.write(",\n".join(" %r;%r;%r;" % vertex for vertex in vertices) + ";\n")
+        f.write(" %d;\n" % len(faces))
+        f.write(",\n".join(" %d;%s;" % (len(face), ",".join(map(str, face))) for face in faces) + ";\n")
+        f.write(" MeshMaterialList {\n  2;\n  %d;\n" % len(faces))
+        f.write(",\n".join("  %d" % i for i in material_face_indexes) + ";\n")
+        f.write("  Material Mat0 {\n   0.8;0.5;0.2;1.0;;\n   5.0;\n   0.1;0.2;0.3;;\n   0.0;0.0;0.0;;\n  }\n")
+        f.write("  Material Mat1 {\n   0.2;0.5;0.8;1.0;;\n   5.0;\n   0.1;0.2;0.3;;\n   0.0;0.0;0.0;;\n  }\n")
+        f.write(" }\n}\n")
+
+# Blender内であればアドオンのインポート全体の時間を返す(それ以外はNone) / Inside Blender, return the time of the whole import by the add-on (None otherwise)
+def time_blender_import(vertices, faces, material_face_indexes):
+    try:
+        import bpy
+    except ImportError:
+        return None
+    import_operators = getattr(bpy.ops, "import")
+    if not hasattr(import_operators, "directx_x_for_bve"):
+        return None
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "weld.x")
+        write_x_file(path, vertices, faces, material_face_indexes)
+        start = time.perf_counter()
+        import_operators.directx_x_for_bve(filepath=path, remove_all=True)
+        return time.perf_counter() - start
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument("--sizes", default="1000,4000,16000,64000,256000")
+    # 以前の実装は2乗に比例するため、これより大きいメッシュでは計測しない / The previous implementation is quadratic, so it is not measured on larger meshes
+    argument_parser.add_argument("--old-limit", type=int, default=16000)
+    args = argument_parser.parse_args(argv)
+    direct_x_parser = load_parser()
+
+    print("{:>9} {:>12} {:>12} {:>12}  {}".format("vertices", "old (s)", "new (s)", "import (s)", "output"))
+    for size in (int(value) for value in args.sizes.split(",")):
+        mesh = generate_mesh(direct_x_parser, size)
+        vertices, faces, material_face_indexes = mesh_to_lists(mesh)
+
+        start = time.perf_counter()
+        new_result = weld_new(direct_x_parser, mesh)
+        new_seconds = time.perf_counter() - start
+
+        old_seconds = None
+        same = ""
+        if size <= args.old_limit:
+            start = time.perf_counter()
+            old_result = weld_old(vertices, faces, material_face_indexes)
+            old_seconds = time.perf_counter() - start
+            same = "identical" if flatten_old_result(old_result) == new_result else "DIFFERENT"
+
+        import_seconds = time_blender_import(vertices, faces, material_face_indexes)
+        print("{:>9,} {:>12} {:>12.4f} {:>12}  {}".format(
+            size,
+            "{:.4f}".format(old_seconds) if old_seconds is not None else "-",
+            new_seconds,
+            "{:.4f}".format(import_seconds) if import_seconds is not None else "-",
+            same,
+        ))
+
+if __name__ == "__main__":
+    main()
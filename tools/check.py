@@ -0,0 +1,66 @@
+# ソースの未定義の名前などをpyflakesで検出する(bpyがなくても実行できる) /
+#  Detect undefined names etc. in the sources with pyflakes (can be run without bpy)
+#
+# 使い方 / Usage: python tools/check.py [paths...]
+
+import ast
+import os
+import sys
+
+from pyflakes import checker, messages
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+
+# エラーとして扱うメッセージ / Messages treated as errors
+ERROR_MESSAGES = (
+    messages.UndefinedName,
+    messages.UndefinedExport,
+    messages.UndefinedLocal,
+    messages.DuplicateArgument,
+    messages.ReturnOutsideFunction,
+    messages.YieldOutsideFunction,
+    messages.ContinueOutsideLoop,
+    messages.BreakOutsideLoop,
+)
+
+class Checker(checker.Checker):
+    # bpyのプロパティは「name: bpy.props.XxxProperty(name="...")」の形で定義されるため、
+    #  アノテーション内の文字列を型の前方参照として解釈しないようにする /
+    #  bpy properties are defined as "name: bpy.props.XxxProperty(name="...")",
+    #  so strings in annotations are not interpreted as forward references to types
+    def handleAnnotation(self, annotation, node):
+        self.handleNode(annotation, node)
+
+def check_file(path):
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    try:
+        tree = ast.parse(source, filename=path)
+    except SyntaxError as e:
+        return ["{}:{}: {}".format(path, e.lineno, e.msg)]
+    result = Checker(tree, filename=path)
+    result.messages.sort(key=lambda m: m.lineno)
+    return [str(m) for m in result.messages if isinstance(m, ERROR_MESSAGES)]
+
+def iter_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+                for name in sorted(files):
+                    if name.endswith(".py"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+def main(argv):
+    paths = argv[1:] or [os.path.normpath(SRC_DIR)]
+    errors = []
+    for path in iter_files(paths):
+        errors += check_file(path)
+    for error in errors:
+        print(error)
+    return 1 if len(errors) > 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))